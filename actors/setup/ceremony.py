@@ -0,0 +1,162 @@
+import os
+import secrets
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+from helpers.key_serializer import KeySerializer, KeyWriter, TRANSCRIPT, circuit_hash
+
+from actors.setup.participant import Participant
+from actors.setup.initial_setup_generator import InitialSetupGenerator
+
+
+def _in_subgroup(points):
+    # Runs in pool workers
+    elliptic_curve_helper = EllipticCurveHelper()
+    return all(elliptic_curve_helper.in_subgroup(point) for point in points)
+
+
+class Ceremony:
+    # Powers of tau ceremony run over transcripts on disk: every contribution verifies the previous transcript,
+    # then writes the next one chunk by chunk, with the chunks rescaled in parallel, so memory stays bounded by
+    # the chunk size and the number of workers rather than by the number of powers
+
+    G1_SECTION = "powers_of_tau_in_g1"
+    G2_SECTION = "powers_of_tau_in_g2"
+
+    CHUNK_SIZE = 1 << 12
+
+    def __init__(self, elliptic_curve_helper: EllipticCurveHelper, directory, n1=None, n2=None, workers=None,
+                 chunk_size=CHUNK_SIZE):
+        self.elliptic_curve_helper = elliptic_curve_helper
+        self.directory = directory
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        # tau^0 .. tau^n in each group
+        n1 = elliptic_curve_helper.N1 if n1 is None else n1
+        n2 = elliptic_curve_helper.N2 if n2 is None else n2
+        self.sections = [
+            (self.G1_SECTION, 1, elliptic_curve_helper.G1, n1 + 1),
+            (self.G2_SECTION, 2, elliptic_curve_helper.G2, n2 + 1)
+        ]
+        self.transcript_hash = circuit_hash("powers of tau", n1, n2)
+
+        os.makedirs(directory, exist_ok=True)
+
+    def transcript_path(self, idx):
+        return os.path.join(self.directory, f"transcript_{idx:04}.g16k")
+
+    def load_transcript(self, path):
+        return KeySerializer.load(path, self.transcript_hash)
+
+    def _chunks(self):
+        for name, _, generator, count in self.sections:
+            for start in range(0, count, self.chunk_size):
+                yield name, generator, start, min(start + self.chunk_size, count)
+
+    def _run_jobs(self, jobs):
+        # jobs yields (tag, function, args); yields (tag, result) in the same order. With workers, at most two jobs
+        # per worker are in flight, so the jobs are only materialised as fast as the results are consumed
+        if self.workers is None or self.workers <= 1:
+            for tag, function, args in jobs:
+                yield tag, function(*args)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for tag, function, args in jobs:
+                pending.append((tag, executor.submit(function, *args)))
+                if len(pending) > 2 * self.workers:
+                    tag, future = pending.popleft()
+                    yield tag, future.result()
+
+            for tag, future in pending:
+                yield tag, future.result()
+
+    def _write_transcript(self, path, jobs):
+        # jobs yields (section name, function, args) in file order
+        sections = [(name, group, True, count) for name, group, _, count in self.sections]
+
+        with KeyWriter(path, TRANSCRIPT, self.transcript_hash, sections) as writer:
+            for name, points in self._run_jobs(jobs):
+                writer.write(name, points)
+
+        return path
+
+    def _combine_powers(self, points):
+        # (sum rho_i * points[i], sum rho_i * points[i + 1]) for random 128-bit rho_i, chunk by chunk
+        ech = self.elliptic_curve_helper
+        powers = shifted = ech.zero_like(points[0])
+
+        for start in range(0, len(points) - 1, self.chunk_size):
+            end = min(start + self.chunk_size, len(points) - 1)
+            chunk = points[start:end + 1]
+            rhos = [secrets.randbits(128) for _ in range(end - start)]
+
+            powers = ech.add(powers, ech.msm(chunk[:-1], rhos))
+            shifted = ech.add(shifted, ech.msm(chunk[1:], rhos))
+
+        return powers, shifted
+
+    def verify_transcript(self, path):
+        # A transcript from another participant is checked before anything builds on it: the powers start at the
+        # generators, tau is not zero, every point is in its subgroup, and consecutive powers share one tau,
+        # checked with a random linear combination per group and one multi-pairing:
+        #   e(sum rho_i * tau^(i+1) G1, G2) = e(sum rho_i * tau^i G1, tau G2)
+        #   e(G1, sum rho'_i * tau^(i+1) G2) = e(tau G1, sum rho'_i * tau^i G2)
+        ech = self.elliptic_curve_helper
+        transcript = self.load_transcript(path)
+
+        for name, _, generator, count in self.sections:
+            if len(transcript[name]) != count:
+                raise Exception(f"Transcript section {name} holds {len(transcript[name])} points, expected {count}")
+            if not ech.eq(transcript[name][0], generator):
+                raise Exception(f"Transcript section {name} does not start at the generator")
+
+        tau_in_g1 = transcript[self.G1_SECTION][1]
+        tau_in_g2 = transcript[self.G2_SECTION][1]
+        if ech.eq(tau_in_g1, ech.zero_like(tau_in_g1)) or ech.eq(tau_in_g2, ech.zero_like(tau_in_g2)):
+            raise Exception("Transcript is for tau = 0")
+
+        # Decoding already checked the curve equation
+        jobs = ((name, _in_subgroup, (transcript[name][start:end],)) for name, _, start, end in self._chunks())
+        for name, in_subgroup in self._run_jobs(jobs):
+            if not in_subgroup:
+                raise Exception(f"Transcript section {name} holds a point outside the prime order subgroup")
+
+        g1_powers, g1_shifted = self._combine_powers(transcript[self.G1_SECTION])
+        g2_powers, g2_shifted = self._combine_powers(transcript[self.G2_SECTION])
+
+        product = ech.multi_pairing([
+            (g1_shifted, ech.G2),
+            (g1_powers, tau_in_g2),
+            (ech.G1, g2_shifted),
+            (tau_in_g1, g2_powers)
+        ], negate=[1, 3])
+
+        if product != product.one():
+            raise Exception("Transcript powers are not consecutive powers of one tau")
+
+        return transcript
+
+    def initialize(self, initial_setup_generator: InitialSetupGenerator, path):
+        secret = initial_setup_generator.generate_secret()
+
+        jobs = (
+            (name, initial_setup_generator.generate_chunk, (generator, secret, start, end))
+            for name, generator, start, end in self._chunks()
+        )
+        return self._write_transcript(path, jobs)
+
+    def contribute(self, participant: Participant, transcript_path, path):
+        transcript = self.verify_transcript(transcript_path)
+        secret = participant.generate_secret()
+
+        # Chunks are decoded lazily from the mapped transcript as the pool asks for more work
+        jobs = (
+            (name, participant.rescale, (transcript[name][start:end], secret, start))
+            for name, _, start, end in self._chunks()
+        )
+        return self._write_transcript(path, jobs)
@@ -1,28 +1,38 @@
+import secrets
+
 from helpers.elliptic_curve_helper import EllipticCurveHelper
+from fields.field import FQ
 
 
 class InitialSetupGenerator:
-    def __init__(self, elliptic_curve_helper: EllipticCurveHelper):
+    def __init__(self, elliptic_curve_helper: EllipticCurveHelper, workers=None):
         self.elliptic_curve_helper = elliptic_curve_helper
+        self.workers = workers
 
-    def _generate_secret(self):
-        random_number = self.elliptic_curve_helper.generate_random_number()
-        return random_number
+    def generate_secret(self):
+        # Uniform over the nonzero field elements, like a participant's secret
+        return secrets.randbelow(FQ.p - 1) + 1
 
-    def _generate_points(self, secret, generator, length):
-        encrypted_powers_of_secret = [generator]
+    def generate_chunk(self, generator, secret, start, end, workers=None):
+        # s^start .. s^(end - 1) as scalars, then independent fixed-base multiplications of the generator
+        powers_of_secret = [pow(secret, start, FQ.p)]
+        for idx in range(start + 1, end):
+            powers_of_secret.append(powers_of_secret[-1] * secret % FQ.p)
 
-        for idx in range(0, length):
-            elem = self.elliptic_curve_helper.multiply(encrypted_powers_of_secret[-1], secret)
-            encrypted_powers_of_secret.append(elem)
+        return self.elliptic_curve_helper.generator_multiply_many(generator, powers_of_secret, workers)
 
-        return encrypted_powers_of_secret
+    def _generate_points(self, secret, generator, length):
+        return self.generate_chunk(generator, secret, 0, length + 1, self.workers)
 
     def act(self):
-        secret = self._generate_secret()
+        secret = self.generate_secret()
 
         # Generate G1 * s and G2 * s
-        encrypted_powers_of_secret_g1 = self._generate_points(secret, self.elliptic_curve_helper.G1, self.elliptic_curve_helper.N1)
-        encrypted_powers_of_secret_g2 = self._generate_points(secret, self.elliptic_curve_helper.G1, self.elliptic_curve_helper.N1)
+        encrypted_powers_of_secret_g1 = self._generate_points(
+            secret, self.elliptic_curve_helper.G1, self.elliptic_curve_helper.N1
+        )
+        encrypted_powers_of_secret_g2 = self._generate_points(
+            secret, self.elliptic_curve_helper.G2, self.elliptic_curve_helper.N2
+        )
 
         return encrypted_powers_of_secret_g1, encrypted_powers_of_secret_g2
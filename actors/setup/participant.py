@@ -1,26 +1,38 @@
+import secrets
+
 from helpers.elliptic_curve_helper import EllipticCurveHelper
+from fields.field import FQ
 
 
 class Participant:
     def __init__(self, elliptic_curve_helper: EllipticCurveHelper):
         self.elliptic_curve_helper = elliptic_curve_helper
 
+    def generate_secret(self):
+        # Toxic waste: anyone who learns it can forge proofs, so it is drawn from the whole field with a CSPRNG
+        return secrets.randbelow(FQ.p - 1) + 1
+
+    def rescale(self, points, secret, first_exponent=0):
+        # points[i] * secret^(first_exponent + i): multiplies the i-th power of tau in by s^i, so a chunk starting
+        # anywhere in the transcript can be updated on its own
+        scalar = pow(secret, first_exponent, FQ.p)
+
+        rescaled = []
+        for point in points:
+            rescaled.append(self.elliptic_curve_helper.multiply(point, scalar))
+            scalar = scalar * secret % FQ.p
+
+        return rescaled
+
     def act(self, points):
         g1_points = points[0]
         g2_points = points[1]
 
         # Generate its own secret as participant (t1)
-        secret_random_number = self.elliptic_curve_helper.generate_random_number()
-
-        # Multiple with its own generated secret random number
-        encrypted_powers_of_secret_g1 = [
-            point * secret_random_number
-            for point in g1_points
-        ]
-
-        encrypted_powers_of_secret_g2 = [
-            point * secret_random_number
-            for point in g2_points
-        ]
+        secret_random_number = self.generate_secret()
+
+        # tau^i * G -> (tau * t1)^i * G for both groups
+        encrypted_powers_of_secret_g1 = self.rescale(g1_points, secret_random_number)
+        encrypted_powers_of_secret_g2 = self.rescale(g2_points, secret_random_number)
 
         return encrypted_powers_of_secret_g1, encrypted_powers_of_secret_g2
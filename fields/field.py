@@ -20,4 +20,103 @@ class FQ:
         return FQ(pow(self.val, other.val, self.p))
 
     def __repr__(self):
-        return f"FQ({self.val})"
\ No newline at end of file
+        return f"FQ({self.val})"
+
+
+class FQVector:
+    # Batch of field elements held as plain reduced ints, so bulk operations avoid one FQ object per element
+    p = FQ.p
+
+    def __init__(self, vals):
+        self.vals = [_.val if isinstance(_, FQ) else _ % self.p for _ in vals]
+
+    @classmethod
+    def _from_reduced(cls, vals):
+        vector = cls.__new__(cls)
+        vector.vals = vals
+        return vector
+
+    @classmethod
+    def zeros(cls, length):
+        return cls._from_reduced([0] * length)
+
+    def _other_vals(self, other):
+        # Scalars are broadcast; sequences must match this vector's length element for element
+        if isinstance(other, FQ):
+            return [other.val] * len(self.vals)
+        if isinstance(other, int):
+            return [other % self.p] * len(self.vals)
+
+        vals = other.vals if isinstance(other, FQVector) else FQVector(other).vals
+        if len(vals) != len(self.vals):
+            raise Exception(f"Vector lengths differ: {len(self.vals)} and {len(vals)}")
+        return vals
+
+    def __len__(self):
+        return len(self.vals)
+
+    def __iter__(self):
+        return (FQ(_) for _ in self.vals)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return FQVector._from_reduced(self.vals[item])
+        return FQ(self.vals[item])
+
+    def __add__(self, other):
+        return FQVector._from_reduced([(a + b) % self.p for a, b in zip(self.vals, self._other_vals(other))])
+
+    def __sub__(self, other):
+        return FQVector._from_reduced([(a - b) % self.p for a, b in zip(self.vals, self._other_vals(other))])
+
+    def __mul__(self, other):
+        return FQVector._from_reduced([a * b % self.p for a, b in zip(self.vals, self._other_vals(other))])
+
+    def __neg__(self):
+        return FQVector._from_reduced([(-_) % self.p for _ in self.vals])
+
+    def __eq__(self, other):
+        return isinstance(other, FQVector) and self.vals == other.vals
+
+    def inverse(self):
+        return batch_inverse(self)
+
+    def dot(self, other):
+        # Accumulate unreduced and reduce once at the end
+        return FQ(sum(a * b for a, b in zip(self.vals, self._other_vals(other))))
+
+    def evaluate(self, x):
+        # Horner evaluation treating the vector as polynomial coefficients, lowest degree first
+        x = x.val if isinstance(x, FQ) else x % self.p
+        result = 0
+        for c in reversed(self.vals):
+            result = (result * x + c) % self.p
+        return result
+
+    def __repr__(self):
+        return f"FQVector({self.vals})"
+
+
+def batch_inverse(values):
+    # Montgomery's trick: invert the product of all elements once, then peel individual inverses off the
+    # prefix products. n inverses cost one exponentiation and about 3n multiplications. Zero maps to zero,
+    # matching FQ division. The batched point normalisations in the curve helpers use the same trick on Z.
+    vals = values.vals if isinstance(values, FQVector) else FQVector(values).vals
+    p = FQ.p
+
+    prefix_products = [1] * len(vals)
+    accumulator = 1
+    for idx, val in enumerate(vals):
+        prefix_products[idx] = accumulator
+        if val:
+            accumulator = accumulator * val % p
+
+    accumulator_inverse = pow(accumulator, p - 2, p)
+
+    inverses = [0] * len(vals)
+    for idx in range(len(vals) - 1, -1, -1):
+        if vals[idx]:
+            inverses[idx] = accumulator_inverse * prefix_products[idx] % p
+            accumulator_inverse = accumulator_inverse * vals[idx] % p
+
+    return FQVector._from_reduced(inverses)
@@ -0,0 +1,539 @@
+import ast
+import hashlib
+import json
+import os
+
+from ast import Assign, Return
+
+from helpers.polynomial_helper import Polynomial
+from helpers.evaluation_domain import EvaluationDomain
+from fields.field import FQ, FQVector
+
+
+class Operand:
+    def __init__(self, val):
+        self.val = val
+        if isinstance(val, str):
+            self.type = "SYMBOL"
+        elif isinstance(val, int):
+            # Constants are field elements; a float has no single reduction both the witness and the R1CS agree on
+            self.type = "CONSTANT"
+        elif isinstance(val, float):
+            raise Exception(f"Circuit constants must be integers, got {val}")
+        else:
+            raise Exception("Invalid operand")
+
+    def __repr__(self):
+        return str(self.val)
+
+
+def _add_term(row, operand, symbol_index):
+    idx = symbol_index[operand.val] if operand.type == "SYMBOL" else 0
+    value = 1 if operand.type == "SYMBOL" else operand.val
+
+    row[idx] = row.get(idx, 0) + value
+
+
+class TypeAssignment:
+    def __init__(self, symbol_a, symbol_b):
+        self.symbol_a = symbol_a
+        self.symbol_b = symbol_b
+
+
+class TypeAddition:
+    OPERATOR = "+"
+
+    def __init__(self, symbol_a, symbol_b, target):
+        self.symbol_a = symbol_a
+        self.symbol_b = symbol_b
+        self.target = target
+
+    def __repr__(self):
+        return f"{self.target} = {self.symbol_a} + {self.symbol_b}"
+
+    def r1cs(self, symbol_index):
+        # Sparse rows {symbol index: coefficient}; index 0 is the constant ~one
+        a = {}
+        b = {0: 1}
+        c = {}
+
+        for symbol in [self.symbol_a, self.symbol_b]:
+            _add_term(a, symbol, symbol_index)
+
+        _add_term(c, self.target, symbol_index)
+
+        return a, b, c
+
+
+class TypeMultiplication:
+    OPERATOR = "*"
+
+    def __init__(self, symbol_a, symbol_b, target):
+        self.symbol_a = symbol_a
+        self.symbol_b = symbol_b
+        self.target = target
+
+    def __repr__(self):
+        return f"{self.target} = {self.symbol_a} * {self.symbol_b}"
+
+    def r1cs(self, symbol_index):
+        a = {}
+        b = {}
+        c = {}
+
+        _add_term(a, self.symbol_a, symbol_index)
+        _add_term(b, self.symbol_b, symbol_index)
+        _add_term(c, self.target, symbol_index)
+
+        return a, b, c
+
+
+GATE_TYPES = {
+    "add": TypeAddition,
+    "mul": TypeMultiplication
+}
+
+
+class CircuitParser:
+    # Flattens the body of a python function into addition and multiplication gates
+
+    def __init__(self):
+        self.gates = []
+        self.symbols_count = 0
+        self.symbols = []
+        self.inputs = []
+
+    def mk_symbol(self):
+        self.symbols_count += 1
+        symbol = f"sym_{self.symbols_count}"
+
+        self.symbols.append(symbol)
+        return Operand(symbol)
+
+    def parse_pow(self, left_symbol, n, target_symbol):
+        if n == 1:
+            self.gates.append(
+                TypeMultiplication(
+                    Operand(left_symbol),
+                    Operand(1),
+                    target_symbol
+                )
+            )
+        elif n == 2:
+            self.gates.append(
+                TypeMultiplication(
+                    Operand(left_symbol),
+                    Operand(left_symbol),
+                    target_symbol
+                )
+            )
+        else:
+            new_symbol = self.mk_symbol()
+            self.gates.append(
+                TypeMultiplication(
+                    new_symbol,
+                    Operand(left_symbol),
+                    target_symbol
+                )
+            )
+
+            self.parse_pow(left_symbol, n - 1, new_symbol)
+
+    def flatten_expression(self, target, value):
+        if not isinstance(target, Operand):
+            target = Operand(target)
+
+        op_to_class = {
+            ast.Add: TypeAddition,
+            ast.Mult: TypeMultiplication
+        }
+
+        if isinstance(value, ast.BinOp):
+            if isinstance(value.op, ast.Pow):
+                assert isinstance(value.left, ast.Name)
+
+                self.parse_pow(value.left.id, value.right.n, target)
+
+            elif isinstance(value.left, ast.BinOp) and not isinstance(value.right, ast.BinOp):
+                new_symbol = self.mk_symbol()
+
+                self.gates.append(op_to_class[type(value.op)](
+                    new_symbol,
+                    Operand(value.right.id if hasattr(value.right, "id") else value.right.n),
+                    target
+                ))
+
+                self.flatten_expression(new_symbol, value.left)
+
+            elif isinstance(value.right, ast.BinOp) and not isinstance(value.left, ast.BinOp):
+                new_symbol = self.mk_symbol()
+
+                self.gates.append(op_to_class[type(value.op)](
+                    Operand(value.left.id if hasattr(value.left, "id") else value.left.n),
+                    new_symbol,
+                    target
+                ))
+
+                self.flatten_expression(new_symbol, value.right)
+
+            elif isinstance(value.right, ast.BinOp) and isinstance(value.left, ast.BinOp):
+                new_symbol_a = self.mk_symbol()
+                new_symbol_b = self.mk_symbol()
+
+                self.gates.append(op_to_class[type(value.op)](
+                    new_symbol_a,
+                    new_symbol_b,
+                    target
+                ))
+
+                self.flatten_expression(new_symbol_a, value.left)
+                self.flatten_expression(new_symbol_b, value.right)
+
+            elif not isinstance(value.right, ast.BinOp) and not isinstance(value.left, ast.BinOp):
+                self.gates.append(op_to_class[type(value.op)](
+                    Operand(value.left.id if hasattr(value.left, "id") else value.left.n),
+                    Operand(value.right.id if hasattr(value.right, "id") else value.right.n),
+                    target
+                ))
+
+    def parse(self, source):
+        code_ast = ast.parse(source)
+
+        self.inputs = [_.arg for _ in code_ast.body[0].args.args]
+        self.symbols.extend(self.inputs)
+
+        ast_nodes = code_ast.body[0].body
+
+        for ast_node in ast_nodes:
+            if not isinstance(ast_node, (Assign, Return)):
+                raise Exception("Invalid Snark")
+            else:
+                if isinstance(ast_node, Assign):
+                    target_variable = ast_node.targets[0].id
+                    value = ast_node.value
+
+                    self.symbols.append(target_variable)
+                    self.flatten_expression(target_variable, value)
+
+                elif isinstance(ast_node, ast.Return):
+                    target_variable = Operand("~out")
+
+                    self.symbols.append("~out")
+                    self.flatten_expression(target_variable, ast_node.value)
+
+        return self.gates, ["~one"] + self.symbols, self.inputs
+
+
+class SparseMatrix:
+    # Constraint matrix in compressed sparse row form: the nonzeros of row i are
+    # columns[row_pointers[i]:row_pointers[i + 1]] with the matching values
+
+    def __init__(self, num_columns, row_pointers, columns, values):
+        self.num_columns = num_columns
+        self.row_pointers = row_pointers
+        self.columns = columns
+        self.values = values
+
+    @staticmethod
+    def from_rows(rows, num_columns):
+        # rows is a list of {column: value} dicts
+        row_pointers = [0]
+        columns = []
+        values = []
+
+        for row in rows:
+            for column in sorted(row):
+                if row[column] % FQ.p:
+                    columns.append(column)
+                    values.append(row[column] % FQ.p)
+            row_pointers.append(len(columns))
+
+        return SparseMatrix(num_columns, row_pointers, columns, values)
+
+    @property
+    def num_rows(self):
+        return len(self.row_pointers) - 1
+
+    def __len__(self):
+        return self.num_rows
+
+    def row(self, idx):
+        start, end = self.row_pointers[idx], self.row_pointers[idx + 1]
+        return list(zip(self.columns[start:end], self.values[start:end]))
+
+    def row_dot(self, idx, witness):
+        start, end = self.row_pointers[idx], self.row_pointers[idx + 1]
+        return sum(witness[self.columns[k]] * self.values[k] for k in range(start, end)) % FQ.p
+
+    def dot(self, witness):
+        # Matrix-vector product against a list of reduced ints, one value per row
+        return [self.row_dot(idx, witness) for idx in range(self.num_rows)]
+
+    def transpose_dot(self, values):
+        # sum_x M[x][y] * values[x] for every column y, touching only the nonzeros
+        result = [0] * self.num_columns
+
+        for x in range(self.num_rows):
+            if values[x]:
+                for k in range(self.row_pointers[x], self.row_pointers[x + 1]):
+                    result[self.columns[k]] += self.values[k] * values[x]
+
+        return [_ % FQ.p for _ in result]
+
+    def column_evaluations(self):
+        # Transposes the nonzeros: column y gets a dense list of its values down the rows
+        evaluations = [[0] * self.num_rows for _ in range(self.num_columns)]
+
+        for x in range(self.num_rows):
+            for k in range(self.row_pointers[x], self.row_pointers[x + 1]):
+                evaluations[self.columns[k]][x] = self.values[k]
+
+        return evaluations
+
+    def to_dense(self):
+        dense = [[0] * self.num_columns for _ in range(self.num_rows)]
+        for x in range(self.num_rows):
+            for column, value in self.row(x):
+                dense[x][column] = value
+        return dense
+
+    def __eq__(self, other):
+        return isinstance(other, SparseMatrix) and self.to_json() == other.to_json()
+
+    def to_json(self):
+        return [self.num_columns, self.row_pointers, self.columns, self.values]
+
+    @staticmethod
+    def from_json(data):
+        return SparseMatrix(*data)
+
+
+class CompiledCircuit:
+    def __init__(self, circuit_hash, gates, symbols, inputs, r1cs, public=None):
+        self.circuit_hash = circuit_hash
+        self.gates = gates
+        self.symbols = symbols
+        self.inputs = inputs
+        self.symbol_index = {symbol: idx for idx, symbol in enumerate(symbols)}
+
+        # Symbols revealed to the verifier: the function's arguments and its output unless configured otherwise.
+        # ~one is always public and comes first; the rest keep their witness order
+        if public is None:
+            public = inputs + (["~out"] if "~out" in self.symbol_index else [])
+        for symbol in public:
+            if symbol not in self.symbol_index:
+                raise Exception(f"Unknown public symbol {symbol}")
+
+        self.public = list(public)
+        public_index_set = {0} | {self.symbol_index[symbol] for symbol in public}
+        self.public_indices = sorted(public_index_set)
+        self.private_indices = [idx for idx in range(len(symbols)) if idx not in public_index_set]
+        self.A, self.B, self.C = r1cs
+        self.domain = EvaluationDomain.get(len(gates))
+
+        self._qap = None
+        self._witness_function = None
+
+    @staticmethod
+    def _r1cs_to_qap(matrix):
+        # Constraint x is attached to the domain point omega^x, padding with empty constraints
+        domain = EvaluationDomain.get(matrix.num_rows)
+
+        return [
+            Polynomial.from_evaluations(evaluations, domain)
+            for evaluations in matrix.column_evaluations()
+        ]
+
+    @property
+    def qap(self):
+        # Per-column polynomials are only interpolated on request; setup and proving work from the sparse rows
+        if self._qap is None:
+            self._qap = [self._r1cs_to_qap(matrix) for matrix in [self.A, self.B, self.C]]
+        return self._qap
+
+    @property
+    def qap_a(self):
+        return self.qap[0]
+
+    @property
+    def qap_b(self):
+        return self.qap[1]
+
+    @property
+    def qap_c(self):
+        return self.qap[2]
+
+    def evaluate_r1cs(self, witness):
+        # A.w, B.w and C.w on the domain, i.e. the evaluations of A(x), B(x) and C(x) at 1, omega, omega^2, ...
+        return [matrix.dot(witness) for matrix in [self.A, self.B, self.C]]
+
+    def _topological_gates(self):
+        # Gates are emitted outermost first while flattening, so order them by their dependencies
+        producers = {gate.target.val: gate for gate in self.gates if gate.target.type == "SYMBOL"}
+
+        known = {"~one"} | set(self.inputs)
+        ordered = []
+        visiting = set()
+
+        # Depth-first with an explicit stack, since dependency chains can be far longer than the recursion limit.
+        # (symbol, True) marks the point where every dependency of symbol has been ordered
+        for root in self.symbols:
+            stack = [(root, False)]
+            while stack:
+                symbol, dependencies_done = stack.pop()
+                if dependencies_done:
+                    visiting.remove(symbol)
+                    known.add(symbol)
+                    ordered.append(producers[symbol])
+                    continue
+
+                if symbol in known:
+                    continue
+                if symbol not in producers:
+                    raise Exception(f"Symbol {symbol} is never assigned")
+                if symbol in visiting:
+                    raise Exception(f"Symbol {symbol} depends on itself")
+
+                visiting.add(symbol)
+                stack.append((symbol, True))
+                gate = producers[symbol]
+                for operand in [gate.symbol_b, gate.symbol_a]:
+                    if operand.type == "SYMBOL":
+                        stack.append((operand.val, False))
+
+        return ordered
+
+    def witness_source(self):
+        # Straight-line python computing every symbol from the function arguments, one statement per gate
+        local_name = {symbol: f"w{idx}" for idx, symbol in enumerate(self.symbols)}
+
+        def expression(operand):
+            if operand.type == "SYMBOL":
+                return local_name[operand.val]
+            return str(operand.val % FQ.p)
+
+        lines = [f"def witness({', '.join(local_name[_] for _ in self.inputs)}):", "    w0 = 1"]
+        for gate in self._topological_gates():
+            lines.append(
+                f"    {local_name[gate.target.val]} = "
+                f"({expression(gate.symbol_a)} {gate.OPERATOR} {expression(gate.symbol_b)}) % p"
+            )
+        lines.append(f"    return [{', '.join(local_name[_] for _ in self.symbols)}]")
+
+        return "\n".join(lines) + "\n"
+
+    @property
+    def witness_function(self):
+        # Compiled once per circuit; the same code object serves every call
+        if self._witness_function is None:
+            namespace = {"p": FQ.p}
+            exec(compile(self.witness_source(), f"<witness {self.circuit_hash.hex()[:16]}>", "exec"), namespace)
+            self._witness_function = namespace["witness"]
+        return self._witness_function
+
+    def generate_witness(self, *args):
+        # Arguments in the order of the function signature; returns the full witness in symbol order
+        signature = f"({', '.join(self.inputs)})"
+        if len(args) != len(self.inputs):
+            raise Exception(f"Circuit {signature} takes {len(self.inputs)} arguments, got {len(args)}")
+        for name, arg in zip(self.inputs, args):
+            if not isinstance(arg, int):
+                raise Exception(f"Circuit {signature} takes integer arguments, got {arg!r} for {name}")
+
+        return FQVector._from_reduced(self.witness_function(*FQVector(args).vals))
+
+    def public_inputs(self, witness):
+        # The part of a witness the verifier sees, in the order of the verifying key
+        return FQVector._from_reduced([FQVector(witness).vals[idx] for idx in self.public_indices])
+
+    def unsatisfied_constraints(self, witness, evaluations=None):
+        # Indices of the constraints with (A.w)_i * (B.w)_i != (C.w)_i
+        a, b, c = evaluations or self.evaluate_r1cs(witness)
+        return [idx for idx in range(len(self.gates)) if (a[idx] * b[idx] - c[idx]) % FQ.p]
+
+    def to_json(self):
+        gate_types = {gate_class: name for name, gate_class in GATE_TYPES.items()}
+
+        return {
+            "circuit_hash": self.circuit_hash.hex(),
+            "gates": [
+                [gate_types[type(gate)], gate.symbol_a.val, gate.symbol_b.val, gate.target.val]
+                for gate in self.gates
+            ],
+            "symbols": self.symbols,
+            "inputs": self.inputs,
+            "public": self.public,
+            "r1cs": [matrix.to_json() for matrix in [self.A, self.B, self.C]]
+        }
+
+    @staticmethod
+    def from_json(data):
+        return CompiledCircuit(
+            bytes.fromhex(data["circuit_hash"]),
+            [
+                GATE_TYPES[gate_type](Operand(symbol_a), Operand(symbol_b), Operand(target))
+                for gate_type, symbol_a, symbol_b, target in data["gates"]
+            ],
+            data["symbols"],
+            data["inputs"],
+            [SparseMatrix.from_json(matrix) for matrix in data["r1cs"]],
+            data["public"]
+        )
+
+
+class CircuitCompiler:
+    # Bump whenever the compiled representation changes, so stale cache entries are not reused
+    VERSION = 5
+
+    # Names a cache directory for compilers built without one
+    CACHE_DIRECTORY_VARIABLE = "GROTH16_CACHE_DIR"
+
+    def __init__(self, cache_directory=None):
+        # The on-disk cache is off unless a directory is passed here or set in the environment;
+        # cache_directory=False turns it off even when the environment names one
+        if cache_directory is False:
+            self.cache_directory = None
+        else:
+            self.cache_directory = cache_directory or os.environ.get(self.CACHE_DIRECTORY_VARIABLE) or None
+
+    @staticmethod
+    def function_body(source):
+        # Drop the decorator line
+        return "\n".join(source.splitlines()[1:])
+
+    def source_hash(self, source, public=None):
+        return hashlib.sha256(f"{self.VERSION}\0{self.function_body(source)}\0{public}".encode()).digest()
+
+    def _cache_path(self, circuit_hash):
+        return os.path.join(self.cache_directory, f"{circuit_hash.hex()}.json")
+
+    def compile(self, source, public=None):
+        # public lists the symbols revealed to the verifier, None for the arguments and ~out
+        circuit_hash = self.source_hash(source, public)
+
+        if self.cache_directory is not None and os.path.exists(self._cache_path(circuit_hash)):
+            with open(self._cache_path(circuit_hash)) as cache_file:
+                return CompiledCircuit.from_json(json.load(cache_file))
+
+        gates, symbols, inputs = CircuitParser().parse(self.function_body(source))
+        r1cs = self._calculate_r1cs(gates, symbols)
+
+        circuit = CompiledCircuit(circuit_hash, gates, symbols, inputs, r1cs, public)
+
+        if self.cache_directory is not None:
+            os.makedirs(self.cache_directory, exist_ok=True)
+
+            # Write then rename, so concurrent compilations never observe a partial file
+            temporary_path = f"{self._cache_path(circuit_hash)}.{os.getpid()}.tmp"
+            with open(temporary_path, "w") as cache_file:
+                json.dump(circuit.to_json(), cache_file)
+            os.replace(temporary_path, self._cache_path(circuit_hash))
+
+        return circuit
+
+    @staticmethod
+    def _calculate_r1cs(gates, symbols):
+        symbol_index = {symbol: idx for idx, symbol in enumerate(symbols)}
+        rows = [gate.r1cs(symbol_index) for gate in gates]
+
+        return [SparseMatrix.from_rows([row[k] for row in rows], len(symbols)) for k in range(3)]
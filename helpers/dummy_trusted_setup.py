@@ -1,22 +1,23 @@
 from helpers.elliptic_curve_helper import EllipticCurveHelper
 from helpers.polynomial_helper import FQ, Polynomial
+from fields.field import batch_inverse
 
 
 class DummyTrustedSetup:
     def _compute_powers_of_tau(self, generator, tau, number_of_elements):
-        encrypted_powers_of_secret = [generator]
-
+        # Scalar powers first, so every point is an independent fixed-base multiplication of the generator
+        powers_of_tau = [1]
         for idx in range(0, number_of_elements - 1):
-            elem = self.elliptic_curve_helper.multiply(encrypted_powers_of_secret[-1], tau)
-            encrypted_powers_of_secret.append(elem)
+            powers_of_tau.append(powers_of_tau[-1] * tau % FQ.p)
 
-        return encrypted_powers_of_secret
+        return self.elliptic_curve_helper.generator_multiply_many(generator, powers_of_tau, self.workers)
 
-    def __init__(self, elliptic_curve_helper: EllipticCurveHelper):
+    def __init__(self, elliptic_curve_helper: EllipticCurveHelper, workers=None):
         self.N1 = 128  # In original setup set this to 4096
         self.N2 = 16
 
         self.elliptic_curve_helper = elliptic_curve_helper
+        self.workers = workers
         self.zx = None
 
         # Hidden elements made public for tests
@@ -39,124 +40,171 @@ class DummyTrustedSetup:
         self.delta_in_g1 = None
         self.delta_in_g2 = None
         self.gamma_in_g2 = None
+        self.alpha_beta_in_gt = None
 
         # Phase 2 elements
+        self.qap_a_tau_in_g1 = None
+        self.qap_b_tau_in_g1 = None
+        self.qap_b_tau_in_g2 = None
         self.li_tau_divided_by_delta = None
         self.li_tau_divided_by_gamma = None
         self.zx_powers_of_tau = None
 
     def execute_phase_1(self):
+        self.generate_secrets()
+        self.compute_powers_of_tau()
+
+    def generate_secrets(self):
+        # Only alpha, beta and tau in the exponent are needed by phase 2; the Snark setup stops here
         self.alpha = self.elliptic_curve_helper.generate_random_number()
         self.beta = self.elliptic_curve_helper.generate_random_number()
         self.tau = self.elliptic_curve_helper.generate_random_number()
 
-        self.powers_of_tau_in_g1 = self._compute_powers_of_tau(
-            self.elliptic_curve_helper.G1,
-            self.tau,
-            self.N1
+        self.beta_in_g1, self.alpha_in_g1 = self.elliptic_curve_helper.generator_multiply_many(
+            self.elliptic_curve_helper.G1, [self.beta, self.alpha], self.workers
         )
 
-        self.powers_of_tau_in_g2 = self._compute_powers_of_tau(
-            self.elliptic_curve_helper.G2,
-            self.tau,
-            self.N2
-        )
+        self.beta_in_g2 = self.elliptic_curve_helper.generator_table(
+            self.elliptic_curve_helper.G2, 1
+        ).multiply(self.beta)
 
-        self.powers_of_tau_in_g1_product_alpha = [self.elliptic_curve_helper.multiply(_, self.alpha)
-                                                  for _ in self.powers_of_tau_in_g1]
+        # e(alpha, beta) is the same for every proof, so the verifier gets it precomputed
+        self.alpha_beta_in_gt = self.elliptic_curve_helper.pairing(self.alpha_in_g1, self.beta_in_g2)
 
-        self.powers_of_tau_in_g1_product_beta = [self.elliptic_curve_helper.multiply(_, self.beta)
-                                                 for _ in self.powers_of_tau_in_g1]
+    def compute_powers_of_tau(self):
+        # Every SRS point is a known multiple of a generator, so all of G1 is computed as one batch of
+        # independent fixed-base multiplications (and one batched normalisation)
+        tau_powers = [1]
+        for idx in range(0, self.N1 - 1):
+            tau_powers.append(tau_powers[-1] * self.tau % FQ.p)
 
-        self.beta_in_g2 = self.elliptic_curve_helper.multiply(
-            self.elliptic_curve_helper.G2,
-            self.beta
-        )
-
-        self.beta_in_g1 = self.elliptic_curve_helper.multiply(
+        g1_points = self.elliptic_curve_helper.generator_multiply_many(
             self.elliptic_curve_helper.G1,
-            self.beta
+            tau_powers + [self.alpha * _ for _ in tau_powers] + [self.beta * _ for _ in tau_powers],
+            self.workers
         )
 
-        self.alpha_in_g1 = self.elliptic_curve_helper.multiply(
-            self.elliptic_curve_helper.G1,
-            self.alpha
+        self.powers_of_tau_in_g1 = g1_points[:self.N1]
+        self.powers_of_tau_in_g1_product_alpha = g1_points[self.N1:2 * self.N1]
+        self.powers_of_tau_in_g1_product_beta = g1_points[2 * self.N1:]
+
+        self.powers_of_tau_in_g2 = self._compute_powers_of_tau(
+            self.elliptic_curve_helper.G2,
+            self.tau,
+            self.N2
         )
 
     def compute_li(self, i, qap_a, qap_b, qap_c):
-        ai_beta_product = self.elliptic_curve_helper.evaluate_polynomial_at_hiding(qap_a[i],
-                                                                                   self.powers_of_tau_in_g1_product_beta
-                                                                                   )
-
-        bi_alpha_product = self.elliptic_curve_helper.evaluate_polynomial_at_hiding(qap_b[i],
-                                                                                    self.powers_of_tau_in_g1_product_alpha
-                                                                                    )
-
-        ci = self.elliptic_curve_helper.evaluate_polynomial_at_hiding(qap_c[i],
-                                                                      self.powers_of_tau_in_g1)
-
-        return self.elliptic_curve_helper.add(
-            ai_beta_product, self.elliptic_curve_helper.add(bi_alpha_product, ci)
+        # Reference form of the phase 2 li(tau) scalars over the powers of tau SRS, kept for the tests;
+        # beta * A_i(tau) + alpha * B_i(tau) + C_i(tau) as a single multi-scalar multiplication
+        return self.elliptic_curve_helper.msm(
+            self.powers_of_tau_in_g1_product_beta[:len(qap_a[i].coeffs)] +
+            self.powers_of_tau_in_g1_product_alpha[:len(qap_b[i].coeffs)] +
+            self.powers_of_tau_in_g1[:len(qap_c[i].coeffs)],
+            qap_a[i].coeffs.vals + qap_b[i].coeffs.vals + qap_c[i].coeffs.vals
         )
 
     @staticmethod
     def calculate_zx(n):
-        result = Polynomial([1])
-
-        for val in range(1, n + 1):
-            result = result * Polynomial([-1 * val, 1])
-        return result
+        # Vanishing polynomial of the multiplicative subgroup of size n: Z(x) = x^n - 1
+        return Polynomial([-1] + [0] * (n - 1) + [1])
+
+    def lagrange_basis_at_tau(self, domain):
+        # L_j(tau) = (tau^n - 1) / n * omega^j / (tau - omega^j) for the domain's Lagrange polynomials
+        zx_value_at_tau = (pow(self.tau, domain.size, FQ.p) - 1) * domain.size_inv % FQ.p
+        denominators_inverse = batch_inverse([(self.tau - omega) % FQ.p for omega in domain.elements]).vals
+
+        return [zx_value_at_tau * omega * denominator_inverse % FQ.p
+                for omega, denominator_inverse in zip(domain.elements, denominators_inverse)]
+
+    def execute_phase_2_from_r1cs(self, A, B, C, domain, public_indices=(0,)):
+        # A_i(tau) = sum_x A[x][i] * L_x(tau): the QAP columns are combined in the Lagrange basis straight
+        # from the sparse constraint rows, without interpolating a polynomial per column
+        lagrange_basis = self.lagrange_basis_at_tau(domain)
+
+        self._execute_phase_2(
+            domain.size,
+            A.transpose_dot(lagrange_basis),
+            B.transpose_dot(lagrange_basis),
+            C.transpose_dot(lagrange_basis),
+            public_indices
+        )
 
-    def execute_phase_2(self, qap_a, qap_b, qap_c):
+    def _execute_phase_2(self, domain_size, qap_a_at_tau, qap_b_at_tau, qap_c_at_tau, public_indices):
         self.delta = self.elliptic_curve_helper.generate_random_number()
         self.gamma = self.elliptic_curve_helper.generate_random_number()
 
-        self.delta_in_g1 = self.elliptic_curve_helper.multiply(
-            self.elliptic_curve_helper.G1, self.delta
-        )
+        delta_inverse, gamma_inverse = batch_inverse([self.delta, self.gamma]).vals
 
-        self.delta_in_g2 = self.elliptic_curve_helper.multiply(
-            self.elliptic_curve_helper.G2, self.delta
-        )
+        # beta * A_i(tau) + alpha * B_i(tau) + C_i(tau), the scalar behind compute_li
+        li_tau = [(self.beta * a + self.alpha * b + c) % FQ.p
+                  for a, b, c in zip(qap_a_at_tau, qap_b_at_tau, qap_c_at_tau)]
 
-        self.gamma_in_g2 = self.elliptic_curve_helper.multiply(
-            self.elliptic_curve_helper.G2,
-            self.gamma
+        self.zx = self.calculate_zx(domain_size)
+        zx_value_at_tau = self.zx.evaluate(self.tau)
+
+        # h(x) has degree at most n - 2, so only the first n - 1 powers are needed
+        zx_powers_of_tau = [zx_value_at_tau * delta_inverse * pow(self.tau, idx, FQ.p)
+                            for idx in range(domain_size - 1)]
+
+        # Public columns are divided by gamma for the verifier, the others by delta for the prover
+        number_of_columns = len(qap_a_at_tau)
+        public_index_set = set(public_indices)
+        public_indices = sorted(public_index_set)
+        private_indices = [idx for idx in range(number_of_columns) if idx not in public_index_set]
+
+        # All phase 2 points are generator multiples; one batch per group
+        g1_points = self.elliptic_curve_helper.generator_multiply_many(
+            self.elliptic_curve_helper.G1,
+            [self.delta] + qap_a_at_tau + qap_b_at_tau +
+            [li_tau[idx] * delta_inverse for idx in private_indices] +
+            [li_tau[idx] * gamma_inverse for idx in public_indices] +
+            zx_powers_of_tau,
+            self.workers
         )
 
-        li_tau = []
-        for i in range(0, len(qap_a)):
-            li_tau.append(self.compute_li(i, qap_a, qap_b, qap_c))
+        self.delta_in_g1 = g1_points[0]
+        g1_points = g1_points[1:]
 
-        self.li_tau_divided_by_delta = [self.elliptic_curve_helper.multiply(_, (FQ(1) / FQ(self.delta)).val)
-                                        for _ in li_tau[1:]]
+        # Committed QAP columns A_i(tau) * G1, B_i(tau) * G1 and B_i(tau) * G2 do not depend on the witness,
+        # so the prover only has to combine them with one MSM per commitment
+        self.qap_a_tau_in_g1 = g1_points[:number_of_columns]
+        self.qap_b_tau_in_g1 = g1_points[number_of_columns:2 * number_of_columns]
+        g1_points = g1_points[2 * number_of_columns:]
 
-        self.li_tau_divided_by_gamma = [self.elliptic_curve_helper.multiply(_, (FQ(1) / FQ(self.gamma)).val)
-                                        for _ in li_tau[:1]]
+        self.li_tau_divided_by_delta = g1_points[:len(private_indices)]
+        self.li_tau_divided_by_gamma = g1_points[len(private_indices):number_of_columns]
+        self.zx_powers_of_tau = g1_points[number_of_columns:]
 
-        self.zx = self.calculate_zx(qap_a[0].degree + 1)
-        zx_value_at_tau = self.zx.evaluate(self.tau)
+        g2_points = self.elliptic_curve_helper.generator_multiply_many(
+            self.elliptic_curve_helper.G2,
+            [self.delta, self.gamma] + qap_b_at_tau,
+            self.workers
+        )
 
-        self.zx_powers_of_tau = [
-            self.elliptic_curve_helper.multiply(_, (zx_value_at_tau * (FQ(1) / FQ(self.delta)).val))
-            for _ in self.powers_of_tau_in_g1]
+        self.delta_in_g2, self.gamma_in_g2 = g2_points[:2]
+        self.qap_b_tau_in_g2 = g2_points[2:]
 
     def get_prover_key(self):
-        return [
-            self.alpha_in_g1,
-            self.beta_in_g1,
-            self.delta_in_g1,
-            self.powers_of_tau_in_g1,
-            self.li_tau_divided_by_delta,
-            self.zx_powers_of_tau,
-            self.beta_in_g2,
-            self.delta_in_g2,
-            self.powers_of_tau_in_g2
-        ]
+        return {
+            "alpha_in_g1": self.alpha_in_g1,
+            "beta_in_g1": self.beta_in_g1,
+            "delta_in_g1": self.delta_in_g1,
+            "qap_a_tau_in_g1": self.qap_a_tau_in_g1,
+            "qap_b_tau_in_g1": self.qap_b_tau_in_g1,
+            "li_tau_divided_by_delta": self.li_tau_divided_by_delta,
+            "zx_powers_of_tau": self.zx_powers_of_tau,
+            "beta_in_g2": self.beta_in_g2,
+            "delta_in_g2": self.delta_in_g2,
+            "qap_b_tau_in_g2": self.qap_b_tau_in_g2
+        }
 
     def get_verifier_key(self):
-        return [
-            self.alpha_in_g1,
-            self.beta_in_g2,
-            self.delta_in_g2
-        ]
+        return {
+            "alpha_in_g1": self.alpha_in_g1,
+            "beta_in_g2": self.beta_in_g2,
+            "alpha_beta_in_gt": self.alpha_beta_in_gt,
+            "gamma_in_g2": self.gamma_in_g2,
+            "delta_in_g2": self.delta_in_g2,
+            "li_tau_divided_by_gamma": self.li_tau_divided_by_gamma
+        }
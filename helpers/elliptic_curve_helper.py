@@ -1,7 +1,176 @@
+import math
 import random
 
+from concurrent.futures import ProcessPoolExecutor
+
 from py_ecc import optimized_bls12_381 as curve
 from fields.field import FQ
+from helpers import jacobian, scalar_recoding
+
+
+class FixedBaseTable:
+    # Windowed table for a base used with many scalars: row i holds j * 2^(w * i) * base for j = 1 .. 2^w - 1,
+    # so a multiplication is one table lookup and addition per window and needs no doublings
+    def __init__(self, base, window_size, num_bits=255):
+        self.base = base
+        self.window_size = window_size
+        self.num_windows = math.ceil(num_bits / window_size)
+        self.mask = (1 << window_size) - 1
+
+        # Built in Jacobian coordinates and normalised together, so lookups can use mixed additions
+        self.group = jacobian.group_of(base)
+
+        points = []
+        window_base = self.group.from_projective(base)
+        for _ in range(self.num_windows):
+            row = [window_base]
+            for _ in range(self.mask - 1):
+                row.append(self.group.add(row[-1], window_base))
+            points.extend(row)
+
+            # 2^w * window_base
+            window_base = self.group.add(row[-1], window_base)
+
+        points = self.group.to_affine(points)
+        self.rows = [points[idx:idx + self.mask] for idx in range(0, len(points), self.mask)]
+
+    @staticmethod
+    def size(window_size, num_bits=255):
+        return math.ceil(num_bits / window_size) * ((1 << window_size) - 1)
+
+    @staticmethod
+    def window_size_for(num_scalars, max_points, num_bits=255):
+        # Minimise building cost plus one addition per window per scalar, within the memory budget
+        candidates = [w for w in range(1, 17) if FixedBaseTable.size(w, num_bits) <= max_points] or [1]
+        return min(
+            candidates,
+            key=lambda w: FixedBaseTable.size(w, num_bits) + num_scalars * math.ceil(num_bits / w)
+        )
+
+    def multiply(self, scalar):
+        scalar = scalar % curve.curve_order
+        result = None
+
+        for row in self.rows:
+            digit = scalar & self.mask
+            if digit:
+                result = row[digit - 1] if result is None else self.group.add_affine(result, row[digit - 1])
+            scalar >>= self.window_size
+            if not scalar:
+                break
+
+        if result is None:
+            return EllipticCurveHelper.zero_like(self.base)
+        return self.group.to_projective(result)
+
+    def multiply_many(self, scalars):
+        return [self.multiply(scalar) for scalar in scalars]
+
+
+class PreparedG2:
+    # Line functions of the Miller loop for a fixed G2 point. py_ecc's loop evaluates, at every step, the line
+    # through the running point R (and Q) at P; that line only depends on Q, so its slope m and intercept c are
+    # computed once here and a pairing with any P just evaluates m * x_P - y_P + c.
+    # Vertical lines (x_P - x_R) are stored with m = None and c = x_R.
+    def __init__(self, point):
+        self.point = point
+        self.lines = []
+
+        if curve.is_inf(point):
+            return
+
+        twisted_q = self._affine(curve.twist(point))
+        r = point
+        for bit in curve.optimized_pairing.pseudo_binary_encoding[62::-1]:
+            twisted_r = self._affine(curve.twist(r))
+            self.lines.append(self._line(twisted_r, twisted_r))
+            r = curve.double(r)
+
+            if bit == 1:
+                twisted_r = self._affine(curve.twist(r))
+                self.lines.append(self._line(twisted_r, twisted_q))
+                r = curve.add(r, point)
+
+    @staticmethod
+    def _affine(point):
+        x, y, z = point
+        z_inverse = z.inv()
+        return x * z_inverse, y * z_inverse
+
+    @staticmethod
+    def _line(point1, point2):
+        x1, y1 = point1
+        x2, y2 = point2
+
+        if x1 != x2:
+            m = (y2 - y1) / (x2 - x1)
+        elif y1 == y2:
+            m = x1 * x1 * 3 / (y1 * 2)
+        else:
+            return None, x1
+
+        return m, y1 - m * x1
+
+    def miller_loop(self, point_in_g1):
+        # Same value as py_ecc's miller_loop(point, point_in_g1, final_exponentiate=False)
+        if not self.lines or curve.is_inf(point_in_g1):
+            return curve.FQ12.one()
+
+        x, y, z = point_in_g1
+        z_inverse = z.one() / z
+        x, y = (x * z_inverse).n, curve.FQ12([(y * z_inverse).n] + [0] * 11)
+        x_in_fq12 = curve.FQ12([x] + [0] * 11)
+
+        lines = iter(self.lines)
+        result = curve.FQ12.one()
+
+        def line_value(m, c):
+            return x_in_fq12 - c if m is None else m * x + (c - y)
+
+        for bit in curve.optimized_pairing.pseudo_binary_encoding[62::-1]:
+            result = result * result * line_value(*next(lines))
+            if bit == 1:
+                result = result * line_value(*next(lines))
+
+        return result
+
+
+class MsmBases:
+    # Bases in the form the bucket method consumes: affine Jacobian points, their negations and the endomorphism
+    # images of both. msm builds one for the terms it needs; bases shared by many MSMs (a batch of proofs over one
+    # key) can be prepared once and passed to msm in place of the points
+    def __init__(self, points):
+        self.group = jacobian.group_of(points[0]) if len(points) else None
+        self.points = []
+        if self.group is not None:
+            self.points = self.group.to_affine([self.group.from_projective(point) for point in points])
+        self.negated = [self.group.neg(point) for point in self.points]
+        self.images = [self.group.endomorphism(point) for point in self.points]
+        self.negated_images = [self.group.neg(point) for point in self.images]
+
+    def __len__(self):
+        return len(self.points)
+
+    def select(self, terms):
+        # (index, negate) pairs -> the bases of those terms, swapped with their negations where asked
+        selected = MsmBases([])
+        selected.group = self.group
+        for name, negated_name in [("points", "negated"), ("images", "negated_images")]:
+            values, negated_values = getattr(self, name), getattr(self, negated_name)
+            setattr(selected, name, [negated_values[idx] if negate else values[idx] for idx, negate in terms])
+            setattr(selected, negated_name, [values[idx] if negate else negated_values[idx] for idx, negate in terms])
+        return selected
+
+    def __getitem__(self, item):
+        # Slices share the precomputation, which lets executors shard prepared bases
+        return self.select([(idx, False) for idx in range(*item.indices(len(self)))])
+
+
+def _generator_multiply_chunk(group, scalars, num_scalars):
+    # Runs in pool workers; each process builds its generator table once and keeps it
+    ech = EllipticCurveHelper()
+    generator = ech.G1 if group == "G1" else ech.G2
+    return ech.generator_table(generator, num_scalars).multiply_many(scalars)
 
 
 class EllipticCurveHelper:
@@ -16,48 +185,319 @@ class EllipticCurveHelper:
     N1 = 4096
     N2 = 16
 
+    # Below this many terms a plain sum of double-and-add multiplications is cheaper than bucketing
+    MSM_THRESHOLD = 8
+    MSM_MAX_WINDOW = 16
+    # Scalars up to this size are bucketed apart from full-size ones, with windows sized for their length
+    MSM_SMALL_SCALAR_BITS = 64
+
+    # Upper bound on the number of points stored in a single fixed-base table
+    FIXED_BASE_TABLE_MAX_POINTS = 1 << 13
+
+    # Generator tables survive across setups, keyed by group
+    _generator_tables = {}
+
     def generate_random_number(self):
         return FQ(random.randint(self.RANDOM_LOWER_LIMIT, self.RANDOM_UPPER_LIMIT)).val
 
     def g1_encrypt(self, val):
-        return curve.multiply(self.G1, val)
+        return self.multiply(self.G1, val)
 
     def g2_encrypt(self, val):
-        return curve.multiply(self.G2, val)
+        return self.multiply(self.G2, val)
 
     @staticmethod
     def multiply(point, val):
-        return curve.multiply(point, val)
+        group = jacobian.group_of(point)
+        return group.to_projective(
+            jacobian.multiply_endomorphism(group, group.from_projective(point), val % curve.curve_order)
+        )
 
     @staticmethod
     def add(point1, point2):
         return curve.add(point1, point2)
 
+    @staticmethod
+    def double(point):
+        return curve.double(point)
+
+    @staticmethod
+    def neg(point):
+        return curve.neg(point)
+
+    @staticmethod
+    def zero_like(point):
+        return point[0].one(), point[0].one(), point[0].zero()
+
+    def fixed_base_table(self, base, num_scalars):
+        window_size = FixedBaseTable.window_size_for(num_scalars, self.FIXED_BASE_TABLE_MAX_POINTS)
+        return FixedBaseTable(base, window_size)
+
+    def fixed_base_msm(self, tables, scalars):
+        # sum(scalar_i * base_i) where every base has a FixedBaseTable; no doublings at all
+        return self.add_points([table.multiply(scalar) for table, scalar in zip(tables, scalars)])
+
+    def _generator_key(self, generator):
+        key, expected = ("G2", self.G2) if isinstance(generator[0], curve.FQ2) else ("G1", self.G1)
+        if not self.eq(generator, expected):
+            raise Exception("Generator tables are only kept for G1 and G2; use fixed_base_table for other bases")
+        return key
+
+    def generator_table(self, generator, num_scalars):
+        # Tables for G1 / G2 are reused unless this batch of scalars justifies a wider window. The cache is keyed by
+        # group, so any other base must go through fixed_base_table instead
+        key = self._generator_key(generator)
+        window_size = FixedBaseTable.window_size_for(num_scalars, self.FIXED_BASE_TABLE_MAX_POINTS)
+        table = self._generator_tables.get(key)
+
+        if table is None or table.window_size < window_size:
+            table = FixedBaseTable(generator, window_size)
+            self._generator_tables[key] = table
+
+        return table
+
+    def generator_multiply_many(self, generator, scalars, workers=None):
+        # Independent fixed-base multiplications, optionally sharded over a process pool, returned in affine form
+        if workers is None or workers <= 1 or len(scalars) < 2 * workers:
+            points = self.generator_table(generator, len(scalars)).multiply_many(scalars)
+        else:
+            group = self._generator_key(generator)
+            chunk_size = math.ceil(len(scalars) / workers)
+            chunks = [scalars[idx:idx + chunk_size] for idx in range(0, len(scalars), chunk_size)]
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    _generator_multiply_chunk, [group] * len(chunks), chunks, [chunk_size] * len(chunks)
+                )
+                points = [point for result in results for point in result]
+
+        return self.normalize_points(points)
+
+    @staticmethod
+    def normalize_points(points):
+        # Projective (X, Y, Z) -> (X / Z, Y / Z, 1) for the whole list, as in batch_inverse
+        finite = [idx for idx, point in enumerate(points) if not curve.is_inf(point)]
+        if not finite:
+            return list(points)
+
+        prefix_products = []
+        accumulator = points[finite[0]][2].one()
+        for idx in finite:
+            prefix_products.append(accumulator)
+            accumulator = accumulator * points[idx][2]
+
+        accumulator_inverse = accumulator.one() / accumulator
+
+        normalized = list(points)
+        for position in range(len(finite) - 1, -1, -1):
+            x, y, z = points[finite[position]]
+            z_inverse = accumulator_inverse * prefix_products[position]
+            accumulator_inverse = accumulator_inverse * z
+
+            normalized[finite[position]] = (x * z_inverse, y * z_inverse, z.one())
+
+        return normalized
+
     def add_points(self, points):
-        result = points[0]
+        # Accumulates in Jacobian coordinates, with mixed additions for points already in affine form
+        group = jacobian.group_of(points[0])
+        result = group.from_projective(points[0])
 
         for point in points[1:]:
-            result = self.add(result, point)
+            point = group.from_projective(point)
+            result = group.add_affine(result, point) if group.is_affine(point) else group.add(result, point)
 
-        return result
+        return group.to_projective(result)
 
     @staticmethod
     def eq(point1, point2):
         return curve.eq(point1, point2)
 
-    def evaluate_polynomial_at_hiding(self, poly, powers_of_tau):
-        result = self.multiply(
-            powers_of_tau[0],
-            poly.coeffs[0].val
+    @staticmethod
+    def in_subgroup(point):
+        # r * P vanishes exactly on the prime order subgroup. This uses plain double-and-add, because the
+        # endomorphism shortcuts are only correct for points already known to be in it
+        group = jacobian.group_of(point)
+        return group.is_infinity(jacobian.multiply(group, group.from_projective(point), curve.curve_order))
+
+    def in_g1(self, point):
+        # For points from untrusted input (proofs, transcripts): right coordinate field, on the curve, in G1
+        return (
+            len(point) == 3 and all(isinstance(_, curve.FQ) for _ in point)
+            and curve.is_on_curve(point, curve.b) and self.in_subgroup(point)
         )
 
-        for c, power_of_tau in zip(poly.coeffs[1:], powers_of_tau[1:]):
-            result = self.add(
-                self.multiply(power_of_tau, c.val),
-                result
-            )
+    def in_g2(self, point):
+        return (
+            len(point) == 3 and all(isinstance(_, curve.FQ2) for _ in point)
+            and curve.is_on_curve(point, curve.b2) and self.in_subgroup(point)
+        )
+
+    @staticmethod
+    def msm_window_size(length, num_bits=255):
+        # Pippenger cost with signed digits: one bucket insertion per term plus two additions for each of the
+        # 2^(c-1) buckets, for every window (one extra window absorbs the final carry)
+        return min(
+            range(1, EllipticCurveHelper.MSM_MAX_WINDOW + 1),
+            key=lambda c: (num_bits // c + 1) * (length + 2 ** c)
+        )
+
+    # Multi-scalar multiplication sum(scalar_i * point_i). Witnesses and QAP coefficients are mostly 0, 1 or
+    # small, so the terms are partitioned first: zeros are dropped, ones are plain additions, and small and
+    # full-size scalars get separate bucket runs, the small one with only a few short windows
+    def msm(self, points, scalars, zero=None):
+        # points may be a list of points or MsmBases prepared for them. An empty list carries no group, so an empty
+        # sum is zero if given, else G1's point at infinity
+        if len(points) != len(scalars):
+            raise Exception(f"Expected one scalar per point, got {len(points)} points and {len(scalars)} scalars")
+        if not len(points):
+            return self.zero_like(self.G1) if zero is None else zero
+
+        ones, small, full = [], [], []
+        for idx, scalar in enumerate(scalars):
+            scalar %= curve.curve_order
+            if scalar == 0:
+                continue
+
+            # -k is as cheap as k, so values just below the order (-1, -2, ...) count as small ones
+            negate = curve.curve_order - scalar < scalar
+            if negate:
+                scalar = curve.curve_order - scalar
+
+            if scalar == 1:
+                ones.append((idx, negate, scalar))
+            elif scalar.bit_length() <= self.MSM_SMALL_SCALAR_BITS:
+                small.append((idx, negate, scalar))
+            else:
+                full.append((idx, negate, scalar))
+
+        if not isinstance(points, MsmBases):
+            # Only the bases with a nonzero scalar are converted; the terms are renumbered to match
+            bases = MsmBases([points[idx] for idx, _, _ in ones + small + full])
+            ones, small, full = [
+                [(start + position, negate, scalar) for position, (_, negate, scalar) in enumerate(terms)]
+                for start, terms in [(0, ones), (len(ones), small), (len(ones) + len(small), full)]
+            ]
+        else:
+            bases = points
+
+        group = bases.group or jacobian.group_of(points[0])
+        result = group.infinity()
+
+        for point in bases.select([(idx, negate) for idx, negate, _ in ones]).points:
+            result = group.add_affine(result, point)
+
+        for terms in [small, full]:
+            if terms:
+                term_bases = bases.select([(idx, negate) for idx, negate, _ in terms])
+                result = group.add(result, self._msm_terms(group, term_bases, [scalar for _, _, scalar in terms]))
+
+        return group.to_projective(result)
+
+    def _msm_terms(self, group, bases, scalars):
+        # bases are MsmBases with one entry per scalar, scalars nonzero and reduced; returns a Jacobian point
+        if len(bases) < self.MSM_THRESHOLD:
+            result = group.infinity()
+            for point, scalar in zip(bases.points, scalars):
+                result = group.add(result, jacobian.multiply_endomorphism(group, point, scalar))
+            return result
+
+        num_bits = max(scalars).bit_length()
+        points, negated_points = bases.points, bases.negated
+
+        # Endomorphism split: k * P = k1 * P + k2 * phi(P) turns n full-length terms into 2n half-length ones,
+        # halving the number of windows and with it the doublings and bucket reductions
+        if num_bits > group.ENDOMORPHISM_EIGENVALUE.bit_length():
+            points = points + bases.images
+            negated_points = negated_points + bases.negated_images
+            scalars = [jacobian.decompose(group, scalar) for scalar in scalars]
+            scalars = [k1 for k1, _ in scalars] + [k2 for _, k2 in scalars]
+            num_bits = max(scalars).bit_length()
+
+        return self._pippenger(group, points, negated_points, scalars, num_bits)
+
+    def _pippenger(self, group, points, negated_points, scalars, num_bits):
+        # Signed window digits in [-2^(c-1), 2^(c-1)]: a negative digit adds the negated point to bucket |digit|,
+        # so each window needs half the buckets of the unsigned method
+        c = self.msm_window_size(len(points), num_bits)
+        num_windows = num_bits // c + 1
+        digits = [scalar_recoding.signed_window_digits(scalar, c, num_windows) for scalar in scalars]
+
+        window_sums = []
+        for window in range(num_windows):
+            buckets = [None] * (1 << (c - 1))
+
+            for point, negated_point, scalar_digits in zip(points, negated_points, digits):
+                digit = scalar_digits[window]
+                if digit:
+                    if digit < 0:
+                        digit, point = -digit, negated_point
+                    bucket = buckets[digit - 1]
+                    buckets[digit - 1] = point if bucket is None else group.add_affine(bucket, point)
+
+            # sum(k * bucket_k) computed as a running sum from the highest bucket down
+            running_sum = None
+            window_sum = None
+            for bucket in reversed(buckets):
+                if bucket is not None:
+                    running_sum = bucket if running_sum is None else group.add(running_sum, bucket)
+                if running_sum is not None:
+                    window_sum = running_sum if window_sum is None else group.add(window_sum, running_sum)
+
+            window_sums.append(window_sum)
+
+        result = group.infinity()
+        for window_sum in reversed(window_sums):
+            for _ in range(c):
+                result = group.double(result)
+            if window_sum is not None:
+                result = group.add(result, window_sum)
+
         return result
 
+    def evaluate_polynomial_at_hiding(self, poly, powers_of_tau):
+        coeffs = poly.coeffs.vals
+        if len(coeffs) > len(powers_of_tau):
+            raise Exception(f"Degree {len(coeffs) - 1} polynomial needs more than {len(powers_of_tau)} powers of tau")
+        return self.msm(powers_of_tau[:len(coeffs)], coeffs)
+
     @staticmethod
     def pairing(point_in_g1, point_in_g2):
         return curve.pairing(point_in_g2, point_in_g1)
+
+    @staticmethod
+    def prepare_msm_bases(points):
+        return MsmBases(points)
+
+    @staticmethod
+    def prepare_g2(point):
+        return PreparedG2(point)
+
+    @staticmethod
+    def miller_loop(point_in_g1, point_in_g2):
+        # Pairing without its final exponentiation; a product of these needs only one final_exponentiate.
+        # point_in_g2 may be a PreparedG2, which skips recomputing the line functions
+        if isinstance(point_in_g2, PreparedG2):
+            return point_in_g2.miller_loop(point_in_g1)
+        if curve.is_inf(point_in_g1) or curve.is_inf(point_in_g2):
+            return curve.FQ12.one()
+        return curve.optimized_pairing.miller_loop(point_in_g2, point_in_g1, final_exponentiate=False)
+
+    @staticmethod
+    def final_exponentiate(value):
+        return curve.final_exponentiate(value)
+
+    def multi_pairing(self, pairs, negate=()):
+        # prod e(P_i, Q_i) over (point in G1, point in G2 or PreparedG2) pairs: the Miller loops are multiplied
+        # together and share one final exponentiation. Pairs whose index is in negate contribute
+        # e(-P_i, Q_i) = e(P_i, Q_i)^-1, so an equation e(A, B) = prod e(P_i, Q_i) can be checked as a product
+        # equal to one
+        negate = set(negate)
+        result = curve.FQ12.one()
+
+        for idx, (point_in_g1, point_in_g2) in enumerate(pairs):
+            if idx in negate:
+                point_in_g1 = self.neg(point_in_g1)
+            result = result * self.miller_loop(point_in_g1, point_in_g2)
+
+        return self.final_exponentiate(result)
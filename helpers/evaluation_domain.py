@@ -0,0 +1,106 @@
+from fields.field import FQ, FQVector
+
+
+class EvaluationDomain:
+    # FQ.p - 1 = 2^32 * t with t odd, and 7 generates the whole multiplicative group
+    TWO_ADICITY = 32
+    MULTIPLICATIVE_GENERATOR = 7
+
+    _domains = {}
+
+    def __init__(self, size):
+        log_size = max(size - 1, 0).bit_length()
+        if log_size > self.TWO_ADICITY:
+            raise Exception("Evaluation domain too large for the field")
+
+        self.size = 1 << log_size
+        self.log_size = log_size
+
+        self.omega = pow(self.MULTIPLICATIVE_GENERATOR, (FQ.p - 1) >> log_size, FQ.p)
+        self.omega_inv = pow(self.omega, FQ.p - 2, FQ.p)
+        self.size_inv = pow(self.size, FQ.p - 2, FQ.p)
+
+        self.coset_shift = self.MULTIPLICATIVE_GENERATOR
+        self.coset_shift_inv = pow(self.coset_shift, FQ.p - 2, FQ.p)
+
+        self.elements = self._powers(self.omega, self.size)
+        self._twiddles = self._powers(self.omega, self.size // 2)
+        self._twiddles_inv = self._powers(self.omega_inv, self.size // 2)
+
+    @classmethod
+    def get(cls, size):
+        # Domains (and their twiddle tables) are shared by everything that needs the same size
+        log_size = max(size - 1, 0).bit_length()
+        if log_size not in cls._domains:
+            cls._domains[log_size] = cls(size)
+        return cls._domains[log_size]
+
+    @staticmethod
+    def _powers(base, length):
+        powers = [1] * length
+        for idx in range(1, length):
+            powers[idx] = powers[idx - 1] * base % FQ.p
+        return powers
+
+    def _pad(self, values):
+        values = list(values.vals) if isinstance(values, FQVector) else FQVector(values).vals
+        if len(values) > self.size:
+            raise Exception("Too many values for the evaluation domain")
+        return values + [0] * (self.size - len(values))
+
+    def _ntt(self, values, twiddles):
+        p = FQ.p
+        n = self.size
+
+        # Bit reversal permutation
+        j = 0
+        for i in range(1, n):
+            bit = n >> 1
+            while j & bit:
+                j ^= bit
+                bit >>= 1
+            j |= bit
+            if i < j:
+                values[i], values[j] = values[j], values[i]
+
+        # Iterative Cooley-Tukey butterflies
+        length = 2
+        while length <= n:
+            half = length >> 1
+            step = n // length
+            for start in range(0, n, length):
+                for k in range(half):
+                    w = twiddles[k * step]
+                    u = values[start + k]
+                    v = values[start + k + half] * w % p
+                    values[start + k] = (u + v) % p
+                    values[start + k + half] = (u - v) % p
+            length <<= 1
+
+        return values
+
+    def fft(self, coeffs):
+        # Coefficients -> evaluations at 1, omega, omega^2, ...
+        return self._ntt(self._pad(coeffs), self._twiddles)
+
+    def ifft(self, evaluations):
+        # Evaluations at 1, omega, omega^2, ... -> coefficients
+        values = self._ntt(self._pad(evaluations), self._twiddles_inv)
+        return [_ * self.size_inv % FQ.p for _ in values]
+
+    def coset_fft(self, coeffs):
+        # Coefficients -> evaluations at g, g * omega, g * omega^2, ...
+        coeffs = self._pad(coeffs)
+        shift = 1
+        for idx in range(self.size):
+            coeffs[idx] = coeffs[idx] * shift % FQ.p
+            shift = shift * self.coset_shift % FQ.p
+        return self._ntt(coeffs, self._twiddles)
+
+    def coset_ifft(self, evaluations):
+        coeffs = self.ifft(evaluations)
+        shift = 1
+        for idx in range(self.size):
+            coeffs[idx] = coeffs[idx] * shift % FQ.p
+            shift = shift * self.coset_shift_inv % FQ.p
+        return coeffs
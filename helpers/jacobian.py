@@ -0,0 +1,397 @@
+from py_ecc import optimized_bls12_381 as curve
+
+from helpers.scalar_recoding import wnaf
+
+
+# Jacobian coordinates for the curves y^2 = x^3 + b over FQ (G1) and FQ2 (G2).
+#
+# A point (X, Y, Z) stands for the affine point (X / Z^2, Y / Z^3), with Z = 0 at infinity. Doubling and
+# mixed addition (against an affine point with Z = 1) need fewer multiplications here than in the homogeneous
+# projective form py_ecc uses, and no step needs a field inversion. Points enter through from_projective,
+# leave through to_projective, and to_affine normalises a whole list at once.
+#
+# G1 coordinates are plain ints reduced mod the base field modulus, which avoids allocating a field element
+# per operation; G2 coordinates stay py_ecc FQ2 elements.
+
+FIELD_MODULUS = curve.field_modulus
+
+# Window of the signed-digit recoding used by variable-base multiplication
+WNAF_WIDTH = 4
+
+# Both groups have a cheap endomorphism that acts on the prime order subgroup as multiplication by a ~128-bit
+# eigenvalue, which splits a scalar into two half-length ones (GLV on G1, GLS with psi^2 on G2). With
+# z = -0xd201000000010000 the BLS parameter:
+#   G1: (x, y) -> (beta * x, y) is multiplication by z^2 - 1, a cube root of unity mod r
+#   G2: (x, y) -> (beta * x, -y) is psi^2, multiplication by z^2
+# where beta is a cube root of unity in FQ.
+BLS_PARAMETER = -0xd201000000010000
+CUBE_ROOT_OF_UNITY = int(
+    "1a0111ea397fe699ec02408663d4de85aa0d857d89759ad4897d29650fb85f9b409427eb4f49fffd8bfd00000000aaac", 16
+)
+
+
+class JacobianG1:
+    ENDOMORPHISM_EIGENVALUE = BLS_PARAMETER ** 2 - 1
+
+    @staticmethod
+    def endomorphism(point):
+        # x = X / Z^2, so scaling X scales x
+        x, y, z = point
+        return CUBE_ROOT_OF_UNITY * x % FIELD_MODULUS, y, z
+
+    @staticmethod
+    def infinity():
+        return 1, 1, 0
+
+    @staticmethod
+    def is_infinity(point):
+        return point[2] == 0
+
+    @staticmethod
+    def is_affine(point):
+        return point[2] == 1
+
+    @staticmethod
+    def neg(point):
+        x, y, z = point
+        return x, -y % FIELD_MODULUS, z
+
+    @staticmethod
+    def from_projective(point):
+        # py_ecc's homogeneous (X, Y, Z) is the affine point (X / Z, Y / Z)
+        x, y, z = point[0].n, point[1].n, point[2].n
+        if z == 1 or z == 0:
+            return x, y, z
+        return x * z % FIELD_MODULUS, y * z * z % FIELD_MODULUS, z
+
+    @staticmethod
+    def to_projective(point):
+        x, y, z = point
+        if z == 0:
+            return curve.Z1
+        if z == 1:
+            return curve.FQ(x), curve.FQ(y), curve.FQ.one()
+        return curve.FQ(x * z), curve.FQ(y), curve.FQ(z * z * z)
+
+    @staticmethod
+    def double(point):
+        # dbl-2009-l, for curves with a = 0
+        x, y, z = point
+        if y == 0 or z == 0:
+            return 1, 1, 0
+
+        p = FIELD_MODULUS
+        a = x * x % p
+        b = y * y % p
+        c = b * b % p
+        d = 2 * ((x + b) * (x + b) - a - c) % p
+        e = 3 * a % p
+
+        x3 = (e * e - 2 * d) % p
+        y3 = (e * (d - x3) - 8 * c) % p
+        z3 = 2 * y * z % p
+        return x3, y3, z3
+
+    @staticmethod
+    def add(point1, point2):
+        # add-2007-bl
+        if point1[2] == 0:
+            return point2
+        if point2[2] == 0:
+            return point1
+
+        p = FIELD_MODULUS
+        x1, y1, z1 = point1
+        x2, y2, z2 = point2
+
+        z1z1 = z1 * z1 % p
+        z2z2 = z2 * z2 % p
+        u1 = x1 * z2z2 % p
+        u2 = x2 * z1z1 % p
+        s1 = y1 * z2 * z2z2 % p
+        s2 = y2 * z1 * z1z1 % p
+
+        h = (u2 - u1) % p
+        r = (s2 - s1) % p
+        if h == 0:
+            return JacobianG1.double(point1) if r == 0 else (1, 1, 0)
+
+        i = 4 * h * h % p
+        j = h * i % p
+        r = 2 * r
+        v = u1 * i % p
+
+        x3 = (r * r - j - 2 * v) % p
+        y3 = (r * (v - x3) - 2 * s1 * j) % p
+        z3 = ((z1 + z2) * (z1 + z2) - z1z1 - z2z2) * h % p
+        return x3, y3, z3
+
+    @staticmethod
+    def add_affine(point1, point2):
+        # madd-2007-bl: point2 is affine, i.e. (x, y, 1) or the point at infinity
+        if point2[2] == 0:
+            return point1
+        if point1[2] == 0:
+            return point2
+
+        p = FIELD_MODULUS
+        x1, y1, z1 = point1
+        x2, y2, _ = point2
+
+        z1z1 = z1 * z1 % p
+        h = (x2 * z1z1 - x1) % p
+        r = (y2 * z1 * z1z1 - y1) % p
+        if h == 0:
+            return JacobianG1.double(point1) if r == 0 else (1, 1, 0)
+
+        hh = h * h % p
+        i = 4 * hh
+        j = h * i % p
+        r = 2 * r
+        v = x1 * i % p
+
+        x3 = (r * r - j - 2 * v) % p
+        y3 = (r * (v - x3) - 2 * y1 * j) % p
+        z3 = ((z1 + h) * (z1 + h) - z1z1 - hh) % p
+        return x3, y3, z3
+
+    @staticmethod
+    def to_affine(points):
+        # (X / Z^2, Y / Z^3, 1) for the whole list, as in batch_inverse; infinity is kept as it is
+        p = FIELD_MODULUS
+        finite = [idx for idx, point in enumerate(points) if point[2] != 0 and point[2] != 1]
+        if not finite:
+            return list(points)
+
+        prefix_products = []
+        accumulator = 1
+        for idx in finite:
+            prefix_products.append(accumulator)
+            accumulator = accumulator * points[idx][2] % p
+
+        accumulator_inverse = pow(accumulator, p - 2, p)
+
+        normalized = list(points)
+        for position in range(len(finite) - 1, -1, -1):
+            x, y, z = points[finite[position]]
+            z_inverse = accumulator_inverse * prefix_products[position] % p
+            accumulator_inverse = accumulator_inverse * z % p
+
+            z_inverse_squared = z_inverse * z_inverse % p
+            normalized[finite[position]] = (x * z_inverse_squared % p, y * z_inverse_squared * z_inverse % p, 1)
+
+        return normalized
+
+
+class JacobianG2:
+    ENDOMORPHISM_EIGENVALUE = BLS_PARAMETER ** 2
+
+    @staticmethod
+    def endomorphism(point):
+        x, y, z = point
+        return x * CUBE_ROOT_OF_UNITY, -y, z
+
+    @staticmethod
+    def infinity():
+        return curve.FQ2.one(), curve.FQ2.one(), curve.FQ2.zero()
+
+    @staticmethod
+    def is_infinity(point):
+        return point[2] == point[2].zero()
+
+    @staticmethod
+    def is_affine(point):
+        return point[2] == point[2].one()
+
+    @staticmethod
+    def neg(point):
+        x, y, z = point
+        return x, -y, z
+
+    @staticmethod
+    def from_projective(point):
+        x, y, z = point
+        if z == z.one() or z == z.zero():
+            return point
+        return x * z, y * z * z, z
+
+    @staticmethod
+    def to_projective(point):
+        x, y, z = point
+        if z == z.zero():
+            return curve.Z2
+        if z == z.one():
+            return point
+        return x * z, y, z * z * z
+
+    @staticmethod
+    def double(point):
+        x, y, z = point
+        if y == y.zero() or z == z.zero():
+            return JacobianG2.infinity()
+
+        a = x * x
+        b = y * y
+        c = b * b
+        d = (x + b) * (x + b) - a - c
+        d = d + d
+        e = a + a + a
+
+        x3 = e * e - d - d
+        c8 = c + c
+        c8 = c8 + c8
+        y3 = e * (d - x3) - c8 - c8
+        z3 = y * z
+        return x3, y3, z3 + z3
+
+    @staticmethod
+    def add(point1, point2):
+        if JacobianG2.is_infinity(point1):
+            return point2
+        if JacobianG2.is_infinity(point2):
+            return point1
+
+        x1, y1, z1 = point1
+        x2, y2, z2 = point2
+
+        z1z1 = z1 * z1
+        z2z2 = z2 * z2
+        u1 = x1 * z2z2
+        u2 = x2 * z1z1
+        s1 = y1 * z2 * z2z2
+        s2 = y2 * z1 * z1z1
+
+        h = u2 - u1
+        r = s2 - s1
+        if h == h.zero():
+            return JacobianG2.double(point1) if r == r.zero() else JacobianG2.infinity()
+
+        i = h + h
+        i = i * i
+        j = h * i
+        r = r + r
+        v = u1 * i
+
+        x3 = r * r - j - v - v
+        s1j = s1 * j
+        y3 = r * (v - x3) - s1j - s1j
+        z3 = ((z1 + z2) * (z1 + z2) - z1z1 - z2z2) * h
+        return x3, y3, z3
+
+    @staticmethod
+    def add_affine(point1, point2):
+        if JacobianG2.is_infinity(point2):
+            return point1
+        if JacobianG2.is_infinity(point1):
+            return point2
+
+        x1, y1, z1 = point1
+        x2, y2, _ = point2
+
+        z1z1 = z1 * z1
+        h = x2 * z1z1 - x1
+        r = y2 * z1 * z1z1 - y1
+        if h == h.zero():
+            return JacobianG2.double(point1) if r == r.zero() else JacobianG2.infinity()
+
+        hh = h * h
+        i = hh + hh
+        i = i + i
+        j = h * i
+        r = r + r
+        v = x1 * i
+
+        x3 = r * r - j - v - v
+        y1j = y1 * j
+        y3 = r * (v - x3) - y1j - y1j
+        z3 = (z1 + h) * (z1 + h) - z1z1 - hh
+        return x3, y3, z3
+
+    @staticmethod
+    def to_affine(points):
+        finite = [
+            idx for idx, point in enumerate(points)
+            if point[2] != point[2].zero() and point[2] != point[2].one()
+        ]
+        if not finite:
+            return list(points)
+
+        prefix_products = []
+        accumulator = curve.FQ2.one()
+        for idx in finite:
+            prefix_products.append(accumulator)
+            accumulator = accumulator * points[idx][2]
+
+        accumulator_inverse = accumulator.one() / accumulator
+
+        normalized = list(points)
+        for position in range(len(finite) - 1, -1, -1):
+            x, y, z = points[finite[position]]
+            z_inverse = accumulator_inverse * prefix_products[position]
+            accumulator_inverse = accumulator_inverse * z
+
+            z_inverse_squared = z_inverse * z_inverse
+            normalized[finite[position]] = (x * z_inverse_squared, y * z_inverse_squared * z_inverse, z.one())
+
+        return normalized
+
+
+def group_of(point):
+    return JacobianG2 if isinstance(point[0], curve.FQ2) else JacobianG1
+
+
+def multiply(group, point, scalar):
+    # Left-to-right double-and-add on a Jacobian point; the additions are mixed when point is affine
+    if scalar == 0 or group.is_infinity(point):
+        return group.infinity()
+
+    add = group.add_affine if group.is_affine(point) else group.add
+    result = point
+    for bit in bin(scalar)[3:]:
+        result = group.double(result)
+        if bit == "1":
+            result = add(result, point)
+
+    return result
+
+
+def decompose(group, scalar):
+    # scalar = k1 + k2 * eigenvalue with both parts below ~2^128, since scalar < r < (eigenvalue + 1)^2
+    return scalar % group.ENDOMORPHISM_EIGENVALUE, scalar // group.ENDOMORPHISM_EIGENVALUE
+
+
+def odd_multiples(group, point, count):
+    # point, 3 * point, 5 * point, ... (count of them) in affine form
+    multiples = [point]
+    if count > 1:
+        double = group.double(point)
+        for _ in range(count - 1):
+            multiples.append(group.add(multiples[-1], double))
+
+    return group.to_affine(multiples)
+
+
+def multiply_endomorphism(group, point, scalar, width=WNAF_WIDTH):
+    # k * P = k1 * P + k2 * phi(P), both halves recoded to width-w NAF and run in one interleaved loop: about
+    # half the doublings of the plain method and one mixed addition per w + 1 bits of each half. The odd
+    # multiples of phi(P) are the endomorphism images of those of P. scalar must already be reduced mod r
+    if scalar == 0 or group.is_infinity(point):
+        return group.infinity()
+
+    k1, k2 = decompose(group, scalar)
+
+    multiples = odd_multiples(group, point, 1 << (width - 2))
+    tables = [multiples, [group.endomorphism(multiple) for multiple in multiples]]
+    recodings = [wnaf(k1, width), wnaf(k2, width)]
+
+    result = group.infinity()
+    for idx in range(max(len(recodings[0]), len(recodings[1])) - 1, -1, -1):
+        result = group.double(result)
+
+        for digits, table in zip(recodings, tables):
+            if idx < len(digits) and digits[idx]:
+                digit = digits[idx]
+                term = table[abs(digit) >> 1]
+                result = group.add_affine(result, term if digit > 0 else group.neg(term))
+
+    return result
@@ -0,0 +1,304 @@
+import hashlib
+import mmap
+import os
+import struct
+
+from py_ecc import optimized_bls12_381 as curve
+from py_ecc.bls.point_compression import compress_G1, decompress_G1, compress_G2, decompress_G2
+
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+
+
+# File layout (all integers big endian):
+#   header   magic "G16K" | version u16 | key type u8 | flags u8 | circuit hash 32 bytes | section count u32
+#   sections name 32 bytes | group u8 | is list u8 | reserved u16 | count u32 | data offset u64
+#   data     fixed-size point records, one run per section
+#
+# Group codes are 1 (G1), 2 (G2) and 12 (target group elements, stored as their 12 FQ coefficients and never
+# compressed). Point records are affine. Uncompressed G1 is x || y (96 bytes), G2 is x_im || x_re || y_im || y_re
+# (192 bytes), with the Zcash infinity bit set in the first byte for the point at infinity. Compressed records use the
+# Zcash encoding: 48 bytes for G1 and 96 bytes for G2.
+
+MAGIC = b"G16K"
+VERSION = 2
+
+PROVING_KEY = 1
+VERIFYING_KEY = 2
+TRANSCRIPT = 3
+
+FLAG_COMPRESSED = 1
+
+_HEADER = struct.Struct(">4sHBB32sI")
+_SECTION_NAME_SIZE = 32
+_SECTION = struct.Struct(f">{_SECTION_NAME_SIZE}sBBHIQ")
+
+_COORDINATE_SIZE = 48
+_INFINITY_FLAG = 1 << 6
+
+GT = 12
+
+
+def _record_size(group, compressed):
+    if group == GT:
+        return GT * _COORDINATE_SIZE
+
+    coordinates = 1 if compressed else 2
+    return coordinates * group * _COORDINATE_SIZE
+
+
+def _group_of(point):
+    if isinstance(point, curve.FQ12):
+        return GT
+    return 2 if isinstance(point[0], curve.FQ2) else 1
+
+
+def _encode_point(point, group, compressed):
+    if group == GT:
+        return b"".join(int(_).to_bytes(_COORDINATE_SIZE, "big") for _ in point.coeffs)
+
+    if compressed:
+        if group == 1:
+            return compress_G1(point).to_bytes(_COORDINATE_SIZE, "big")
+        z1, z2 = compress_G2(point)
+        return z1.to_bytes(_COORDINATE_SIZE, "big") + z2.to_bytes(_COORDINATE_SIZE, "big")
+
+    if curve.is_inf(point):
+        record = bytearray(_record_size(group, compressed))
+        record[0] = _INFINITY_FLAG
+        return bytes(record)
+
+    x, y, _ = point
+    if group == 1:
+        coordinates = [x.n, y.n]
+    else:
+        coordinates = [x.coeffs[1], x.coeffs[0], y.coeffs[1], y.coeffs[0]]
+
+    return b"".join(int(_).to_bytes(_COORDINATE_SIZE, "big") for _ in coordinates)
+
+
+def _decode_point(record, group, compressed):
+    coordinates = [
+        int.from_bytes(record[idx:idx + _COORDINATE_SIZE], "big")
+        for idx in range(0, len(record), _COORDINATE_SIZE)
+    ]
+
+    if group == GT:
+        return curve.FQ12(coordinates)
+
+    if compressed:
+        return decompress_G1(coordinates[0]) if group == 1 else decompress_G2(tuple(coordinates))
+
+    if record[0] & _INFINITY_FLAG:
+        return curve.Z1 if group == 1 else curve.Z2
+
+    if group == 1:
+        point = curve.FQ(coordinates[0]), curve.FQ(coordinates[1]), curve.FQ.one()
+    else:
+        point = (
+            curve.FQ2((coordinates[1], coordinates[0])),
+            curve.FQ2((coordinates[3], coordinates[2])),
+            curve.FQ2.one()
+        )
+
+    # Compressed records are checked by decompression; uncompressed ones would otherwise load unchecked
+    if not curve.is_on_curve(point, curve.b if group == 1 else curve.b2):
+        raise Exception("Key file holds a point that is not on the curve")
+
+    return point
+
+
+def circuit_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class PointArray:
+    # Read-only sequence of points decoded on access straight from the mapped file
+
+    def __init__(self, key, name, group, count, offset):
+        self.key = key
+        self.name = name
+        self.group = group
+        self.count = count
+        self.offset = offset
+        self.record_size = _record_size(group, key.compressed)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[idx] for idx in range(*item.indices(self.count))]
+
+        if item < 0:
+            item += self.count
+        if not 0 <= item < self.count:
+            raise IndexError("Point index out of range")
+
+        start = self.offset + item * self.record_size
+        return _decode_point(self.key.buffer[start:start + self.record_size], self.group, self.key.compressed)
+
+    def __iter__(self):
+        return (self[idx] for idx in range(self.count))
+
+    def __reduce__(self):
+        # Pickles as a reference to the file, so pool workers map the same pages instead of copying points
+        return _load_section, (self.key.path, self.name)
+
+
+class MappedKey:
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as key_file:
+            self.buffer = mmap.mmap(key_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, key_type, flags, key_circuit_hash, section_count = _HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise Exception("Not a key file")
+        if version != VERSION:
+            raise Exception(f"Unsupported key file version {version}")
+
+        self.version = version
+        self.key_type = key_type
+        self.compressed = bool(flags & FLAG_COMPRESSED)
+        self.circuit_hash = key_circuit_hash
+
+        self.sections = {}
+        for idx in range(section_count):
+            name, group, is_list, _, count, offset = _SECTION.unpack_from(
+                self.buffer, _HEADER.size + idx * _SECTION.size
+            )
+            name = name.rstrip(b"\0").decode()
+            points = PointArray(self, name, group, count, offset)
+            self.sections[name] = points if is_list else points[0]
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def keys(self):
+        return self.sections.keys()
+
+    def validate(self):
+        # Decoding checks the curve equation; this adds the much costlier subgroup check for every point
+        ech = EllipticCurveHelper()
+        for name, section in self.sections.items():
+            points = section if isinstance(section, PointArray) else [section]
+            if points and _group_of(points[0]) != GT and not all(ech.in_subgroup(point) for point in points):
+                raise Exception(f"Key section {name} holds a point outside the prime order subgroup")
+
+    def __reduce__(self):
+        return KeySerializer.load, (self.path,)
+
+
+_loaded_keys = {}
+
+
+def _load_section(path, name):
+    # One mapping per file and process, shared by every section unpickled from it
+    if path not in _loaded_keys:
+        _loaded_keys[path] = KeySerializer.load(path)
+    return _loaded_keys[path][name]
+
+
+class KeyWriter:
+    # Writes a key whose section sizes are known up front, chunk by chunk, so a long point list never has to be
+    # held in memory at once. sections is a list of (name, group, is_list, count) in file order. The key goes to a
+    # temporary file renamed over path on close, so a key still mapped from path is never truncated under its reader
+
+    def __init__(self, path, key_type, key_circuit_hash, sections, compressed=False):
+        self.compressed = compressed
+        self.ech = EllipticCurveHelper()
+
+        offset = _HEADER.size + len(sections) * _SECTION.size
+        header = [_HEADER.pack(
+            MAGIC, VERSION, key_type, FLAG_COMPRESSED if compressed else 0, key_circuit_hash, len(sections)
+        )]
+
+        # name -> [group, points still to write, file position of the next record]
+        self.sections = {}
+        for name, group, is_list, count in sections:
+            if len(name.encode()) > _SECTION_NAME_SIZE:
+                raise Exception(f"Section name {name} is longer than {_SECTION_NAME_SIZE} bytes")
+            header.append(_SECTION.pack(name.encode(), group, int(is_list), 0, count, offset))
+            self.sections[name] = [group, count, offset]
+            offset += count * _record_size(group, compressed)
+
+        self.path = path
+        self.temporary_path = f"{path}.{os.getpid()}.tmp"
+        self.key_file = open(self.temporary_path, "wb")
+        self.key_file.write(b"".join(header))
+
+    def write(self, name, points):
+        # Appends points to the section; chunks of one section must arrive in order
+        group, remaining, offset = self.sections[name]
+        if len(points) > remaining:
+            raise Exception(f"Too many points for section {name}")
+
+        if not self.compressed and group != GT:
+            points = self.ech.normalize_points(points)
+        records = b"".join(_encode_point(point, group, self.compressed) for point in points)
+
+        self.key_file.seek(offset)
+        self.key_file.write(records)
+        self.sections[name] = [group, remaining - len(points), offset + len(records)]
+
+    def _discard(self):
+        self.key_file.close()
+        os.remove(self.temporary_path)
+
+    def close(self):
+        incomplete = [name for name, (_, remaining, _) in self.sections.items() if remaining]
+        if incomplete:
+            self._discard()
+            raise Exception(f"Sections not fully written: {', '.join(incomplete)}")
+
+        self.key_file.close()
+        os.replace(self.temporary_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+
+class KeySerializer:
+    @staticmethod
+    def dump(path, key, key_type, key_circuit_hash, compressed=False):
+        # key maps a name to a point or a list of points, in the order the sections are written; a loaded MappedKey
+        # can be dumped again, even to the path it is mapped from
+        sections = []
+        for name in key.keys():
+            value = key[name]
+            is_list = isinstance(value, (list, PointArray))
+            points = list(value) if is_list else [value]
+            group = _group_of(points[0]) if points else 1
+            sections.append((name, group, is_list, points))
+
+        with KeyWriter(
+            path, key_type, key_circuit_hash,
+            [(name, group, is_list, len(points)) for name, group, is_list, points in sections],
+            compressed
+        ) as writer:
+            for name, _, _, points in sections:
+                writer.write(name, points)
+
+    @staticmethod
+    def load(path, expected_circuit_hash=None, validate=False):
+        # validate checks every point for subgroup membership up front, for keys that come from elsewhere
+        key = MappedKey(path)
+        if expected_circuit_hash is not None and key.circuit_hash != expected_circuit_hash:
+            raise Exception("Key was generated for a different circuit")
+        if validate:
+            key.validate()
+        return key
@@ -1,64 +1,91 @@
 from typing import List, Union
-from fields.field import FQ
+from fields.field import FQ, FQVector, batch_inverse
+from helpers.evaluation_domain import EvaluationDomain
 
 
 class Polynomial:
-    def __init__(self, coeffs: List[Union[float, FQ]]):
-        self.coeffs = [FQ(_) if not isinstance(_, FQ) else _ for _ in coeffs]
-        self.degree = len(coeffs) - 1
+    # Below this length schoolbook multiplication beats three NTTs
+    NTT_THRESHOLD = 64
 
-    def __mul__(self, other):
-        final_coeffs = [FQ(0) for _ in range(other.degree + self.degree + 1)]
+    def __init__(self, coeffs: Union[List[Union[float, FQ]], FQVector]):
+        self.coeffs = coeffs if isinstance(coeffs, FQVector) else FQVector(coeffs)
+        self.degree = len(coeffs) - 1
 
-        for idx_a in range(0, len(self.coeffs)):
-            for idx_b in range(0, len(other.coeffs)):
-                final_coeffs[idx_a + idx_b] += self.coeffs[idx_a] * other.coeffs[idx_b]
+    @staticmethod
+    def _mul_values(values_a, values_b):
+        length = len(values_a) + len(values_b) - 1
 
-        return Polynomial(final_coeffs)
+        if min(len(values_a), len(values_b)) <= Polynomial.NTT_THRESHOLD:
+            result = [0] * length
+            for idx_a, a in enumerate(values_a):
+                if a:
+                    for idx_b, b in enumerate(values_b):
+                        result[idx_a + idx_b] += a * b
+            return [_ % FQ.p for _ in result]
 
-    def __add__(self, other):
-        coeffs_a = self.coeffs if len(self.coeffs) > len(other.coeffs) else other.coeffs
-        coeffs_b = self.coeffs if len(self.coeffs) <= len(other.coeffs) else other.coeffs
+        domain = EvaluationDomain.get(length)
+        evaluations = [a * b % FQ.p for a, b in zip(domain.fft(values_a), domain.fft(values_b))]
+        return domain.ifft(evaluations)[:length]
 
-        for idx in range(len(coeffs_b)):
-            coeffs_a[idx] += coeffs_b[idx]
+    @staticmethod
+    def _inverse_series(values, length):
+        # Newton iteration for 1 / values mod x^length, doubling the precision every step
+        inverse = [pow(values[0], FQ.p - 2, FQ.p)]
+        precision = 1
 
-        return Polynomial(coeffs_a)
+        while precision < length:
+            precision = min(2 * precision, length)
+            product = Polynomial._mul_values(values[:precision], inverse)[:precision]
+            correction = [(-_) % FQ.p for _ in product]
+            correction[0] = (correction[0] + 2) % FQ.p
+            inverse = Polynomial._mul_values(inverse, correction)[:precision]
 
-    def __sub__(self, other):
-        coeffs_a = self.coeffs if len(self.coeffs) > len(other.coeffs) else other.coeffs
-        coeffs_b = self.coeffs if len(self.coeffs) <= len(other.coeffs) else other.coeffs
+        return inverse
 
-        coeffs_b = coeffs_b + [FQ(0) for _ in range(len(coeffs_a) - len(coeffs_b))]
+    def __mul__(self, other):
+        return Polynomial(FQVector._from_reduced(self._mul_values(self.coeffs.vals, other.coeffs.vals)))
 
-        if coeffs_a != self.coeffs:
-            coeffs_a, coeffs_b = coeffs_b, coeffs_a
+    def _padded_coeffs(self, length):
+        return FQVector._from_reduced(self.coeffs.vals + [0] * (length - len(self.coeffs)))
 
-        for idx in range(len(coeffs_a)):
-            coeffs_a[idx] -= coeffs_b[idx]
+    def __add__(self, other):
+        length = max(len(self.coeffs), len(other.coeffs))
+        return Polynomial(self._padded_coeffs(length) + other._padded_coeffs(length))
 
-        return Polynomial(coeffs_a)
+    def __sub__(self, other):
+        length = max(len(self.coeffs), len(other.coeffs))
+        return Polynomial(self._padded_coeffs(length) - other._padded_coeffs(length))
 
     def __truediv__(self, other):
-        result_coeffs = [FQ(0) for _ in range(self.degree - other.degree + 1)]
-        remainder = self
-
-        for idx in range(self.degree - other.degree + 1):
-            self_power_of_x = len(remainder.coeffs) - idx - 1
-            other_power_of_x = len(other.coeffs) - 1
-
-            self_coeff = remainder.coeffs[self_power_of_x]
-            other_coeff = other.coeffs[other_power_of_x]
-
-            max_degree = self_power_of_x - other_power_of_x
-
-            mult_poly = [FQ(0) if idx < max_degree else (self_coeff / other_coeff) for idx in range(max_degree + 1)]
-            result_coeffs[max_degree] = (self_coeff / other_coeff)
-
-            remainder = remainder - (other * Polynomial(mult_poly))
-
-        if not all([_.val for _ in remainder.coeffs]):
-            return Polynomial(result_coeffs)
+        dividend = list(self.coeffs.vals)
+        divisor = other.coeffs.vals
+        quotient_length = self.degree - other.degree + 1
+
+        if min(quotient_length, len(divisor)) <= self.NTT_THRESHOLD:
+            # Long division in place on the remainder
+            remainder = dividend
+            quotient = [0] * quotient_length
+            leading_inverse = pow(divisor[-1], FQ.p - 2, FQ.p)
+
+            for idx in range(quotient_length - 1, -1, -1):
+                coeff = remainder[idx + other.degree] * leading_inverse % FQ.p
+                quotient[idx] = coeff
+                if coeff:
+                    for offset, d in enumerate(divisor):
+                        remainder[idx + offset] = (remainder[idx + offset] - coeff * d) % FQ.p
+        else:
+            # Reversed polynomials turn division into multiplication by a power series inverse
+            reversed_quotient = self._mul_values(
+                dividend[::-1][:quotient_length],
+                self._inverse_series(divisor[::-1], quotient_length)
+            )[:quotient_length]
+            quotient = reversed_quotient[::-1]
+
+            product = self._mul_values(quotient, divisor)
+            remainder = [(a - b) % FQ.p for a, b in zip(dividend, product)]
+
+        if not any(remainder):
+            return Polynomial(FQVector._from_reduced(quotient))
         else:
             raise Exception("Polynomials not divisible")
 
@@ -66,30 +93,45 @@ class Polynomial:
         return f"{', '.join([str(_.val) for _ in self.coeffs])}"
 
     @staticmethod
-    def from_points(points):
-        lps = []
+    def from_evaluations(evaluations, domain: EvaluationDomain):
+        return Polynomial(FQVector._from_reduced(domain.ifft(evaluations)))
 
-        for point_a in points:
-            poly = Polynomial([1])
-            for point_b in points:
-                if point_a != point_b:
-                    poly = poly * Polynomial([FQ(-1) * point_b[0], 1])
-                    poly = poly * Polynomial([FQ(1) / (point_a[0] - point_b[0])])
-
-            poly = poly * Polynomial([point_a[1]])
-            lps.append(poly)
-
-        final_polynomial = Polynomial([0])
-        for poly in lps:
-            final_polynomial += poly
-
-        return final_polynomial
+    @staticmethod
+    def from_points(points):
+        xs = [_[0].val if isinstance(_[0], FQ) else _[0] % FQ.p for _ in points]
+        ys = [_[1].val if isinstance(_[1], FQ) else _[1] % FQ.p for _ in points]
+
+        domain = EvaluationDomain.get(len(points))
+        if domain.size == len(points) and xs == domain.elements:
+            return Polynomial(FQVector._from_reduced(domain.ifft(ys)))
+
+        # Lagrange interpolation through the vanishing polynomial M(x) = prod(x - x_i):
+        # L_i(x) = M(x) / ((x - x_i) * M'(x_i)), each quotient found by synthetic division and all the
+        # M'(x_i) inverted together
+        master = [1]
+        for x in xs:
+            master = Polynomial._mul_values(master, [(-x) % FQ.p, 1])
+
+        master_derivative = FQVector([idx * coeff for idx, coeff in enumerate(master)][1:])
+        denominator_inverses = batch_inverse([master_derivative.evaluate(x) for x in xs])
+
+        result = [0] * len(points)
+        for x, y, denominator_inverse in zip(xs, ys, denominator_inverses.vals):
+            weight = y * denominator_inverse % FQ.p
+            if weight:
+                quotient = [0] * len(points)
+                carry = 0
+                for idx in range(len(points), 0, -1):
+                    carry = (master[idx] + carry * x) % FQ.p
+                    quotient[idx - 1] = carry
+
+                for idx, coeff in enumerate(quotient):
+                    result[idx] += weight * coeff
+
+        return Polynomial(FQVector(result))
 
     def evaluate(self, x):
-        result = 0
-        for idx, c in enumerate(self.coeffs):
-            result += c.val * pow(x, idx)
-        return result
+        return self.coeffs.evaluate(x)
 
     @staticmethod
     def sum(polynomials):
@@ -0,0 +1,174 @@
+import math
+import os
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+
+
+# Proving key bases held by a pool worker process, loaded once by the pool initializer
+_worker_bases = {}
+
+
+def _load_worker_bases(bases, prepare=False):
+    # Each worker decodes the bases once, as the serial executor does in load
+    _worker_bases.clear()
+    if prepare:
+        ech = EllipticCurveHelper()
+        bases = {name: ech.prepare_msm_bases(points) for name, points in bases.items()}
+    else:
+        bases = {name: list(points) for name, points in bases.items()}
+    _worker_bases.update(bases)
+
+
+def _worker_msm(name, start, end, scalars):
+    return EllipticCurveHelper().msm(_worker_bases[name][start:end], scalars)
+
+
+class SerialProverExecutor:
+    # Runs every multi-scalar multiplication of a proof in the calling thread
+
+    def __init__(self):
+        self.ech = EllipticCurveHelper()
+        self.bases = {}
+        self.prepared = None
+
+    def load(self, bases):
+        # bases maps a proving key entry name to its list of points. A mapped key decodes (and checks) a record on
+        # every access, so the points are decoded once here and the key file only serves as storage
+        self.bases = {name: list(points) for name, points in bases.items()}
+        self.prepared = None
+
+    def prepare(self):
+        # Before a batch of proofs: every base is decoded and converted for the bucket method once (MsmBases) and
+        # reused by all MSMs until release. This holds the key in memory several times over, so it is only
+        # worth it while the batch lasts
+        self.prepared = {name: self.ech.prepare_msm_bases(points) for name, points in self.bases.items()}
+
+    def release(self):
+        self.prepared = None
+
+    def _bases(self, name):
+        return self.bases[name] if self.prepared is None else self.prepared[name]
+
+    def _check_job(self, name, scalars):
+        # A job may cover a prefix of its bases (h(x) has fewer coefficients than there are powers of tau), never more
+        if len(scalars) > len(self.bases[name]):
+            raise Exception(f"{len(scalars)} scalars for the {len(self.bases[name])} bases of {name}")
+
+    def _job_bases(self, name, scalars):
+        self._check_job(name, scalars)
+        bases = self._bases(name)
+        return bases if len(scalars) == len(bases) else bases[:len(scalars)]
+
+    def _empty_sum(self, name):
+        bases = self.bases[name]
+        return self.ech.zero_like(bases[0]) if len(bases) else self.ech.msm([], [])
+
+    def msm_many(self, jobs):
+        # jobs is a list of (base name, scalars); returns one point per job
+        return [
+            self.ech.msm(self._job_bases(name, scalars), scalars) if scalars else self._empty_sum(name)
+            for name, scalars in jobs
+        ]
+
+    def close(self):
+        pass
+
+
+class _PoolProverExecutor(SerialProverExecutor, ABC):
+    # Splits every job into contiguous shards and runs all shards of all jobs concurrently; subclasses pick the
+    # kind of pool and how a shard is handed to it
+
+    MIN_SHARD_SIZE = 16
+
+    def __init__(self, workers=None):
+        super().__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+
+    @abstractmethod
+    def _create_pool(self):
+        pass
+
+    @abstractmethod
+    def _submit(self, name, start, end, scalars):
+        pass
+
+    def load(self, bases):
+        super().load(bases)
+        self.close()
+
+    def _shards(self, name, scalars):
+        self._check_job(name, scalars)
+        length = len(scalars)
+        shard_count = max(1, min(self.workers, length // self.MIN_SHARD_SIZE))
+        shard_size = math.ceil(length / shard_count) if length else 1
+
+        return [(start, min(start + shard_size, length)) for start in range(0, length, shard_size)]
+
+    def msm_many(self, jobs):
+        if self.pool is None:
+            self.pool = self._create_pool()
+
+        futures = [
+            [self._submit(name, start, end, scalars[start:end]) for start, end in self._shards(name, scalars)]
+            for name, scalars in jobs
+        ]
+
+        results = []
+        for (name, _), job_futures in zip(jobs, futures):
+            partial_sums = [future.result() for future in job_futures]
+            if partial_sums:
+                results.append(self.ech.add_points(partial_sums))
+            else:
+                results.append(self._empty_sum(name))
+
+        return results
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+class ThreadPoolProverExecutor(_PoolProverExecutor):
+    def _create_pool(self):
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _submit(self, name, start, end, scalars):
+        return self.pool.submit(self.ech.msm, self._bases(name)[start:end], scalars)
+
+
+class ProcessPoolProverExecutor(_PoolProverExecutor):
+    # Workers are started once and keep the proving key resident; only scalars travel per proof
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self.prepare_in_workers = False
+
+    def load(self, bases):
+        # Bases go to the workers as they are (a mapped key pickles as a reference to its file) and are decoded there
+        self.bases = dict(bases)
+        self.prepared = None
+        self.close()
+
+    def prepare(self):
+        # The workers hold the bases, so the pool is restarted with an initializer that prepares them there
+        self.close()
+        self.prepare_in_workers = True
+
+    def release(self):
+        self.close()
+        self.prepare_in_workers = False
+
+    def _create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_load_worker_bases,
+            initargs=(self.bases, self.prepare_in_workers)
+        )
+
+    def _submit(self, name, start, end, scalars):
+        return self.pool.submit(_worker_msm, name, start, end, scalars)
@@ -0,0 +1,41 @@
+# Signed-digit representations of scalars. Negating a curve point is free, so digits may be negative, which
+# lets a multiplication get by with half the precomputed multiples (or half the Pippenger buckets).
+
+
+def wnaf(scalar, width):
+    # Width-w non-adjacent form, least significant digit first: every nonzero digit is odd, lies in
+    # (-2^(w-1), 2^(w-1)) and is followed by at least w - 1 zeros, so about one digit in w + 1 is nonzero
+    digits = []
+    modulus = 1 << width
+    half = modulus >> 1
+
+    while scalar:
+        if scalar & 1:
+            digit = scalar & (modulus - 1)
+            if digit >= half:
+                digit -= modulus
+            scalar -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        scalar >>= 1
+
+    return digits
+
+
+def signed_window_digits(scalar, window_size, num_windows):
+    # Base 2^c digits in [-2^(c-1), 2^(c-1)], least significant first: a digit above half the window borrows
+    # from the next one. num_windows must leave room for the final carry, i.e. exceed bit_length / c
+    digits = []
+    modulus = 1 << window_size
+    half = modulus >> 1
+
+    for _ in range(num_windows):
+        digit = scalar & (modulus - 1)
+        scalar >>= window_size
+        if digit > half:
+            digit -= modulus
+            scalar += 1
+        digits.append(digit)
+
+    return digits
@@ -1,95 +1,20 @@
-import ast
 import inspect
-
-from ast import Assign, Return
-from pprint import pprint
+import itertools
+import os
+import secrets
 
 from helpers.polynomial_helper import Polynomial
 from helpers.elliptic_curve_helper import EllipticCurveHelper
 from helpers.dummy_trusted_setup import DummyTrustedSetup
+from helpers.prover_executor import SerialProverExecutor
+from helpers.key_serializer import KeySerializer, PROVING_KEY, VERIFYING_KEY
+from helpers.circuit_compiler import CircuitCompiler
 
-from fields.field import FQ
+from fields.field import FQ, FQVector
 
 from helpers.utils import *
 
 
-class Operand:
-    def __init__(self, val):
-        self.val = val
-        if isinstance(val, str):
-            self.type = "SYMBOL"
-        elif isinstance(val, (int, float)):
-            self.type = "CONSTANT"
-        else:
-            raise Exception("Invalid operand")
-
-
-class TypeAssignment:
-    def __init__(self, symbol_a, symbol_b):
-        self.symbol_a = symbol_a
-        self.symbol_b = symbol_b
-
-
-class TypeAddition:
-    def __init__(self, symbol_a, symbol_b, target):
-        self.symbol_a = symbol_a
-        self.symbol_b = symbol_b
-        self.target = target
-
-    def r1cs(self, symbols_order):
-        a = [0 for _ in symbols_order]
-        b = [0 for _ in symbols_order]
-        c = [0 for _ in symbols_order]
-
-        if self.symbol_a.type == "SYMBOL":
-            a[symbols_order.index(self.symbol_a.val)] = 1
-        else:
-            a[0] = self.symbol_a.val
-
-        if self.symbol_b.type == "SYMBOL":
-            a[symbols_order.index(self.symbol_b.val)] = 1
-        else:
-            a[0] += self.symbol_b.val
-
-        b[0] = 1
-
-        if self.target.type == "SYMBOL":
-            c[symbols_order.index(self.target.val)] = 1
-        else:
-            c[0] = self.target.val
-
-        return a, b, c
-
-
-class TypeMultiplication:
-    def __init__(self, symbol_a, symbol_b, target):
-        self.symbol_a = symbol_a
-        self.symbol_b = symbol_b
-        self.target = target
-
-    def r1cs(self, symbols_order):
-        a = [0 for _ in symbols_order]
-        b = [0 for _ in symbols_order]
-        c = [0 for _ in symbols_order]
-
-        if self.symbol_a.type == "SYMBOL":
-            a[symbols_order.index(self.symbol_a.val)] = 1
-        else:
-            a[0] = self.symbol_a.val
-
-        if self.symbol_b.type == "SYMBOL":
-            b[symbols_order.index(self.symbol_b.val)] = 1
-        else:
-            b[0] = self.symbol_b.val
-
-        if self.target.type == "SYMBOL":
-            c[symbols_order.index(self.target.val)] = 1
-        else:
-            c[0] = self.target.val
-
-        return a, b, c
-
-
 class SourceParser:
     @staticmethod
     def get_source(function):
@@ -98,285 +23,387 @@ class SourceParser:
 
 class Snark:
 
-    def __init__(self, function, source_parser=SourceParser()):
-        self.function = function
-        self.source_parser = source_parser
-        self.gates = []
-        self.symbols_count = 0
-        self.symbols = []
-
-        self.ech = EllipticCurveHelper()
-        self.trusted_setup = DummyTrustedSetup(self.ech)
-
-        self.trusted_setup.execute_phase_1()
-        self._initialise()
-
-    def mk_symbol(self):
-        self.symbols_count += 1
-        symbol = f"sym_{self.symbols_count}"
-
-        self.symbols.append(symbol)
-        return Operand(symbol)
-
-    def parse_pow(self, left_symbol, n, target_symbol):
-        if n == 1:
-            self.gates.append(
-                TypeMultiplication(
-                    Operand(left_symbol),
-                    Operand(1),
-                    target_symbol
-                )
-            )
-        elif n == 2:
-            self.gates.append(
-                TypeMultiplication(
-                    Operand(left_symbol),
-                    Operand(left_symbol),
-                    target_symbol
-                )
-            )
-        else:
-            new_symbol = self.mk_symbol()
-            self.gates.append(
-                TypeMultiplication(
-                    new_symbol,
-                    Operand(left_symbol),
-                    target_symbol
-                )
-            )
-
-            self.parse_pow(left_symbol, n - 1, new_symbol)
-
-    def flatten_expression(self, target, value):
-        if not isinstance(target, Operand):
-            target = Operand(target)
-
-        op_to_class = {
-            ast.Add: TypeAddition,
-            ast.Mult: TypeMultiplication
-        }
+    # Proving key entries the prover runs multi-scalar multiplications over
+    PROVER_BASES = [
+        "qap_a_tau_in_g1",
+        "qap_b_tau_in_g1",
+        "qap_b_tau_in_g2",
+        "li_tau_divided_by_delta",
+        "zx_powers_of_tau"
+    ]
 
-        if isinstance(value, ast.BinOp):
-            if isinstance(value.op, ast.Pow):
-                assert isinstance(value.left, ast.Name)
+    # Fixed-base tables for the public input bases are sized as if each served this many verifications
+    PUBLIC_INPUT_TABLE_SCALARS = 256
 
-                self.parse_pow(value.left.id, value.right.n, target)
+    # Proofs whose MSMs prove_batch hands to the executor together, unless told otherwise
+    PROOF_GROUP_SIZE = 4
 
-            elif isinstance(value.left, ast.BinOp) and not isinstance(value.right, ast.BinOp):
-                new_symbol = self.mk_symbol()
-
-                self.gates.append(op_to_class[type(value.op)](
-                    new_symbol,
-                    Operand(value.right.id if hasattr(value.right, "id") else value.right.n),
-                    target
-                ))
-
-                self.flatten_expression(new_symbol, value.left)
-
-            elif isinstance(value.right, ast.BinOp) and not isinstance(value.left, ast.BinOp):
-                new_symbol = self.mk_symbol()
+    def __init__(self, function, source_parser=SourceParser(), executor=None, key_directory=None, compiler=None,
+                 public=None):
+        self.function = function
+        self.source_parser = source_parser
 
-                self.gates.append(op_to_class[type(value.op)](
-                    Operand(value.left.id if hasattr(value.left, "id") else value.left.n),
-                    Operand(new_symbol),
-                    target
-                ))
+        # Symbols revealed to the verifier, None for the function's arguments and ~out
+        self.public = public
 
-                self.flatten_expression(new_symbol, value.right)
+        self.ech = EllipticCurveHelper()
 
-            elif isinstance(value.right, ast.BinOp) and isinstance(value.left, ast.BinOp):
-                new_symbol_a = self.mk_symbol()
-                new_symbol_b = self.mk_symbol()
+        # Serial, thread pool or process pool executor for the prover's multi-scalar multiplications
+        self.executor = executor or SerialProverExecutor()
+
+        # Parses the function and builds the R1CS / QAP, cached on disk by source hash
+        self.compiler = compiler or CircuitCompiler()
+
+        # Keys are read from / written to this directory, named after the circuit hash
+        self.key_directory = key_directory
+
+        # Compilation and the trusted setup only run on first use, so decorating a function stays cheap
+        self._circuit = None
+        self._trusted_setup = None
+        self._proving_key = None
+        self._verifying_key = None
+        self._prepared_verifying_key = None
+
+    @property
+    def circuit(self):
+        if self._circuit is None:
+            self._circuit = self.compiler.compile(self.source_parser.get_source(self.function), self.public)
+        return self._circuit
+
+    @property
+    def gates(self):
+        return self.circuit.gates
+
+    @property
+    def symbols(self):
+        return self.circuit.symbols
+
+    @property
+    def qap_a(self):
+        return self.circuit.qap_a
+
+    @property
+    def qap_b(self):
+        return self.circuit.qap_b
+
+    @property
+    def qap_c(self):
+        return self.circuit.qap_c
+
+    @property
+    def domain(self):
+        return self.circuit.domain
+
+    @property
+    def circuit_hash(self):
+        return self.circuit.circuit_hash
+
+    @property
+    def trusted_setup(self):
+        self._ensure_keys()
+        return self._trusted_setup
+
+    @property
+    def proving_key(self):
+        self._ensure_keys()
+        return self._proving_key
+
+    @property
+    def verifying_key(self):
+        self._ensure_keys()
+        return self._verifying_key
+
+    @property
+    def prepared_verifying_key(self):
+        # Miller loop line coefficients for the fixed G2 points of the verifying key (beta needs none, since
+        # e(alpha, beta) is already part of the key) and fixed-base tables for the public input bases
+        if self._prepared_verifying_key is None:
+            self._prepared_verifying_key = {
+                name: self.ech.prepare_g2(self.verifying_key[name]) for name in ["gamma_in_g2", "delta_in_g2"]
+            }
+            self._prepared_verifying_key["li_tau_divided_by_gamma"] = [
+                self.ech.fixed_base_table(point, self.PUBLIC_INPUT_TABLE_SCALARS)
+                for point in self.verifying_key["li_tau_divided_by_gamma"]
+            ]
+        return self._prepared_verifying_key
+
+    def _ensure_keys(self):
+        if self._proving_key is None:
+            self._setup_keys()
+
+    def _key_paths(self):
+        name = self.circuit_hash.hex()
+        return (
+            os.path.join(self.key_directory, f"{name}.pk"),
+            os.path.join(self.key_directory, f"{name}.vk")
+        )
 
-                self.gates.append(op_to_class[type(value.op)](
-                    Operand(new_symbol_a),
-                    Operand(new_symbol_b),
-                    target
-                ))
+    def _setup_keys(self):
+        self._trusted_setup = DummyTrustedSetup(self.ech)
 
-                self.flatten_expression(new_symbol_a, value.left)
-                self.flatten_expression(new_symbol_b, value.right)
+        if self.key_directory is not None and all(os.path.exists(_) for _ in self._key_paths()):
+            proving_key_path, verifying_key_path = self._key_paths()
 
-            elif not isinstance(value.right, ast.BinOp) and not isinstance(value.left, ast.BinOp):
-                self.gates.append(op_to_class[type(value.op)](
-                    Operand(value.left.id if hasattr(value.left, "id") else value.left.n),
-                    Operand(value.right.id if hasattr(value.right, "id") else value.right.n),
-                    target
-                ))
+            self._proving_key = KeySerializer.load(proving_key_path, self.circuit_hash)
+            self._verifying_key = KeySerializer.load(verifying_key_path, self.circuit_hash)
+            self._prepared_verifying_key = None
+        else:
+            # Phase 2 works from the secrets directly, so the powers of tau SRS is never computed here
+            self._trusted_setup.generate_secrets()
+            self.execute_trusted_setup_phase_2()
 
-    def _initialise(self):
-        source = self.source_parser.get_source(self.function)
+            if self.key_directory is not None:
+                self.save_keys()
 
-        source = "\n".join(source.splitlines()[1:])
-        code_ast = ast.parse(source)
+        self.executor.load({name: self._proving_key[name] for name in self.PROVER_BASES})
 
-        input_arguments = [_.arg for _ in code_ast.body[0].args.args]
-        self.symbols.extend(input_arguments)
+    def execute_trusted_setup_phase_2(self):
+        circuit = self.circuit
+        self._trusted_setup.execute_phase_2_from_r1cs(
+            circuit.A, circuit.B, circuit.C, circuit.domain, circuit.public_indices
+        )
 
-        ast_nodes = code_ast.body[0].body
+        self._proving_key = self._trusted_setup.get_prover_key()
+        self._verifying_key = self._trusted_setup.get_verifier_key()
+        self._prepared_verifying_key = None
 
-        for ast_node in ast_nodes:
-            if not isinstance(ast_node, (Assign, Return)):
-                raise Exception("Invalid Snark")
-            else:
-                if isinstance(ast_node, Assign):
-                    target_variable = ast_node.targets[0].id
-                    value = ast_node.value
+    def save_keys(self, compressed=False):
+        os.makedirs(self.key_directory, exist_ok=True)
+        proving_key_path, verifying_key_path = self._key_paths()
 
-                    self.symbols.append(target_variable)
-                    self.flatten_expression(target_variable, value)
+        KeySerializer.dump(proving_key_path, self.proving_key, PROVING_KEY, self.circuit_hash, compressed)
+        KeySerializer.dump(verifying_key_path, self.verifying_key, VERIFYING_KEY, self.circuit_hash, compressed)
 
-                elif isinstance(ast_node, ast.Return):
-                    target_variable = Operand("~out")
+    def verify_witness(self, witness, evaluations=None):
+        witness = FQVector(witness) if not isinstance(witness, FQVector) else witness
+        circuit = self.circuit
 
-                    self.symbols.append("~out")
-                    self.flatten_expression(target_variable, ast_node.value)
+        if len(witness) != len(circuit.symbols):
+            raise Exception(f"Witness has {len(witness)} values, expected {len(circuit.symbols)}")
 
-        self._calculate_r1cs()
-        self.execute_trusted_setup_phase_2()
+        # One sparse matrix-vector product per matrix, O(nonzeros), then a pointwise check per constraint
+        unsatisfied = circuit.unsatisfied_constraints(witness.vals, evaluations)
+        if unsatisfied:
+            idx = unsatisfied[0]
+            raise Exception(
+                f"Witness does not satisfy constraint {idx} ({circuit.gates[idx]}), "
+                f"{len(unsatisfied)} constraint(s) failing in total"
+            )
 
-    def execute_trusted_setup_phase_2(self):
-        self.trusted_setup.execute_phase_2(self.qap_a, self.qap_b, self.qap_c)
+    def _evaluate_qap(self, witness, evaluations=None):
+        # A(x), B(x) and C(x) for this witness: the sparse rows give their values on the domain directly,
+        # and one inverse NTT each turns them into coefficients
+        return [
+            FQVector._from_reduced(self.domain.ifft(values))
+            for values in evaluations or self.circuit.evaluate_r1cs(witness.vals)
+        ]
 
-    @staticmethod
-    def _r1cs_to_qap(matrix):
-        qap = []
+    def calculate_hx(self, witness):
+        witness = FQVector(witness) if not isinstance(witness, FQVector) else witness
 
-        for y in range(len(matrix[0])):
-            points = []
-            for x in range(len(matrix)):
-                points.append((FQ(x + 1), FQ(matrix[x][y])))
+        return self._calculate_hx_from_coeffs(*self._evaluate_qap(witness))
 
-            polynomial = Polynomial.from_points(points)
-            qap.append(polynomial)
+    def _calculate_hx_from_coeffs(self, ax, bx, cx):
+        # h(x) = (A(x)B(x) - C(x)) / Z(x) in evaluation form. On the coset g*H the vanishing polynomial
+        # x^n - 1 is the constant g^n - 1, so the division is pointwise and h comes back with one inverse NTT
+        A = self.domain.coset_fft(ax)
+        B = self.domain.coset_fft(bx)
+        C = self.domain.coset_fft(cx)
 
-        return qap
+        zx_on_coset_inverse = pow(pow(self.domain.coset_shift, self.domain.size, FQ.p) - 1, FQ.p - 2, FQ.p)
 
-    def _calculate_r1cs(self):
-        self.symbols = [Operand("~one")] + self.symbols
+        hx_on_coset = [(a * b - c) * zx_on_coset_inverse % FQ.p for a, b, c in zip(A, B, C)]
 
-        A = []
-        B = []
-        C = []
+        # deg h <= n - 2
+        hx = Polynomial(FQVector._from_reduced(self.domain.coset_ifft(hx_on_coset)[:self.domain.size - 1]))
+        return hx
 
-        for gate in self.gates:
-            constraints = gate.r1cs(self.symbols)
+    def _proof_tables(self, num_proofs):
+        # Every proof multiplies delta in G1 by r, s and r * s and delta in G2 by s; across a batch these are
+        # fixed-base multiplications, so each gets a windowed table sized for the whole batch
+        return {
+            "delta_in_g1": self.ech.fixed_base_table(self.proving_key["delta_in_g1"], 3 * num_proofs),
+            "delta_in_g2": self.ech.fixed_base_table(self.proving_key["delta_in_g2"], num_proofs)
+        }
 
-            A.append(constraints[0])
-            B.append(constraints[1])
-            C.append(constraints[2])
+    def _randomiser_term(self, name, scalar, tables=None):
+        # (point, scalar) for scalar * key point: from the batch's table when there is one, else left to the MSM
+        if tables is not None and name in tables:
+            return tables[name].multiply(scalar), 1
+        return self.proving_key[name], scalar
 
-        self.qap_a = self._r1cs_to_qap(A)
-        self.qap_b = self._r1cs_to_qap(B)
-        self.qap_c = self._r1cs_to_qap(C)
+    def _proof_jobs(self, witness):
+        # Checks the witness, draws r and s and computes h(x); returns the randomisers and the five MSM jobs
+        witness = FQVector(witness) if not isinstance(witness, FQVector) else witness
 
-    def verify_witness(self, witness):
+        # Verify witness, reusing the constraint evaluations for h(x)
+        evaluations = self.circuit.evaluate_r1cs(witness.vals)
+        self.verify_witness(witness, evaluations)
 
-        for x in range(1, self.qap_a[0].degree + 2):
-            A = [FQ(poly.evaluate(x)) for poly in self.qap_a]
-            B = [FQ(poly.evaluate(x)) for poly in self.qap_b]
-            C = [FQ(poly.evaluate(x)) for poly in self.qap_c]
+        self.r = self.ech.generate_random_number()
+        self.s = self.ech.generate_random_number()
 
-            eq_result = dot(witness, A) * dot(witness, B) - dot(witness, C)
-            assert (eq_result.val == 0)
+        hx = self._calculate_hx_from_coeffs(*self._evaluate_qap(witness, evaluations))
+
+        # The committed QAP columns come from the setup, so every witness term is a single MSM of the witness
+        # against them. The five MSMs are independent and handed to the executor together.
+        return self.r, self.s, [
+            ("qap_a_tau_in_g1", witness.vals),
+            ("qap_b_tau_in_g2", witness.vals),
+            ("qap_b_tau_in_g1", witness.vals),
+            ("li_tau_divided_by_delta", [witness.vals[idx] for idx in self.circuit.private_indices]),
+            ("zx_powers_of_tau", hx.coeffs.vals)
+        ]
+
+    def _sum_terms(self, *terms):
+        # sum scalar * point over (point, scalar) pairs; scalars of 1 are plain additions inside msm
+        points, scalars = zip(*terms)
+        return self.ech.msm(list(points), list(scalars))
+
+    def _combine_proof(self, r, s, msm_results, tables=None):
+        w_dot_A_in_g1, w_dot_B_in_g2, w_dot_B_in_g1, w_dot_li_in_g1, product_of_hx_zx = msm_results
+
+        A_in_g1 = self._sum_terms(
+            (self.proving_key["alpha_in_g1"], 1),
+            (w_dot_A_in_g1, 1),
+            self._randomiser_term("delta_in_g1", r, tables)
+        )
 
-    def calculate_hx(self, witness):
-        A = Polynomial.sum([Polynomial([witness[idx]]) * poly
-                            for idx, poly in enumerate(self.qap_a)])
+        B_in_g2 = self._sum_terms(
+            (self.proving_key["beta_in_g2"], 1),
+            (w_dot_B_in_g2, 1),
+            self._randomiser_term("delta_in_g2", s, tables)
+        )
 
-        B = Polynomial.sum([Polynomial([witness[idx]]) * poly
-                            for idx, poly in enumerate(self.qap_b)])
+        B_in_g1 = self._sum_terms(
+            (self.proving_key["beta_in_g1"], 1),
+            (w_dot_B_in_g1, 1),
+            self._randomiser_term("delta_in_g1", s, tables)
+        )
 
-        C = Polynomial.sum([Polynomial([witness[idx]]) * poly
-                            for idx, poly in enumerate(self.qap_c)])
+        C_in_g1 = self._sum_terms(
+            (w_dot_li_in_g1, 1),
+            (product_of_hx_zx, 1),
+            (A_in_g1, s),
+            (B_in_g1, r),
+            self._randomiser_term("delta_in_g1", -r * s % FQ.p, tables)
+        )
 
-        hx = (A * B - C) / self.trusted_setup.zx
-        return hx
+        # Proofs leave in affine form
+        A_in_g1, C_in_g1 = self.ech.normalize_points([A_in_g1, C_in_g1])
+        B_in_g2, = self.ech.normalize_points([B_in_g2])
 
-    def _generate_proof(self, witness):
-        # Verify witness
-        self.verify_witness(witness)
+        return [A_in_g1, B_in_g2, C_in_g1]
 
-        self.r = self.ech.generate_random_number()
-        self.s = self.ech.generate_random_number()
+    def _generate_proof(self, witness, tables=None):
+        r, s, jobs = self._proof_jobs(witness)
 
-        w_dot_A_in_g1 = self.ech.add_points([self.ech.multiply(
-            self.ech.evaluate_polynomial_at_hiding(self.qap_a[idx], self.trusted_setup.powers_of_tau_in_g1),
-            witness[idx].val
-        ) for idx in range(len(self.qap_a))])
+        # The executor only holds the proving key bases once the setup has run or the keys were loaded
+        self._ensure_keys()
 
-        A_in_g1 = self.ech.add_points([
-            self.trusted_setup.alpha_in_g1,
-            w_dot_A_in_g1,
-            self.ech.multiply(self.trusted_setup.delta_in_g1, self.r)
-        ])
+        return self._combine_proof(r, s, self.executor.msm_many(jobs), tables)
 
-        w_dot_B_in_g2 = self.ech.add_points([self.ech.multiply(
-            self.ech.evaluate_polynomial_at_hiding(self.qap_b[idx], self.trusted_setup.powers_of_tau_in_g2),
-            witness[idx].val
-        ) for idx in range(len(self.qap_b))])
+    def prove_batch(self, witnesses, batch_size=None):
+        # Proves many witnesses of this circuit, yielding the proofs in order. Shared by the whole batch: the
+        # executor's bases, prepared for the bucket method once rather than per MSM, and fixed-base tables for the
+        # delta randomisers. The MSMs of batch_size proofs at a time go to the executor in one call, so a pool
+        # works on all of their shards at once; proofs are yielded as each such group completes, so only one group
+        # of witnesses is held at a time however long the input is.
+        batch_size = batch_size or self.PROOF_GROUP_SIZE
+        witnesses = iter(witnesses)
 
-        w_dot_B_in_g1 = self.ech.add_points([self.ech.multiply(
-            self.ech.evaluate_polynomial_at_hiding(self.qap_b[idx], self.trusted_setup.powers_of_tau_in_g1),
-            witness[idx].val
-        ) for idx in range(len(self.qap_b))])
+        self._ensure_keys()
+        tables = self._proof_tables(batch_size)
 
-        B_in_g2 = self.ech.add_points([
-            self.trusted_setup.beta_in_g2,
-            w_dot_B_in_g2,
-            self.ech.multiply(self.trusted_setup.delta_in_g2, self.s)
-        ])
+        self.executor.prepare()
+        try:
+            while True:
+                group = [self._proof_jobs(witness) for witness in itertools.islice(witnesses, batch_size)]
+                if not group:
+                    break
 
-        B_in_g1 = self.ech.add_points([
-            self.trusted_setup.beta_in_g1,
-            w_dot_B_in_g1,
-            self.ech.multiply(self.trusted_setup.delta_in_g1, self.s)
-        ])
+                msm_results = self.executor.msm_many([job for _, _, jobs in group for job in jobs])
+                for idx, (r, s, jobs) in enumerate(group):
+                    yield self._combine_proof(r, s, msm_results[idx * len(jobs):(idx + 1) * len(jobs)], tables)
+        finally:
+            self.executor.release()
 
-        w_dot_li_in_g1 = self.ech.add_points(
-            [self.ech.multiply(self.trusted_setup.li_tau_divided_by_delta[idx - 1], witness[idx].val)
-             for idx in range(1, len(self.trusted_setup.li_tau_divided_by_delta) + 1)]
-        )
+    def public_inputs(self, witness):
+        return self.circuit.public_inputs(witness)
 
-        hx = self.calculate_hx(witness)
-        product_of_hx_zx = self.ech.add_points([
-            self.ech.multiply(self.trusted_setup.zx_powers_of_tau[idx], coeff.val)
-            for idx, coeff in enumerate(hx.coeffs)
-        ])
+    def _public_input_term(self, public_inputs):
+        # sum x_i * L_i(tau) / gamma over the public inputs (~one first), one table lookup per window per input
+        tables = self.prepared_verifying_key["li_tau_divided_by_gamma"]
+        if len(public_inputs) != len(tables):
+            raise Exception(f"Expected {len(tables)} public inputs, got {len(public_inputs)}")
 
-        C_in_g1 = self.ech.add_points([
-            w_dot_li_in_g1,
-            product_of_hx_zx,
-            self.ech.multiply(A_in_g1, self.s),
-            self.ech.multiply(B_in_g1, self.r),
-            self.ech.multiply(self.trusted_setup.delta_in_g1, FQ(-1).val * self.r * self.s)
-        ])
+        return self.ech.fixed_base_msm(tables, public_inputs)
 
-        return [A_in_g1, B_in_g2, C_in_g1]
+    def is_well_formed(self, proof):
+        # The pairing and the GLV multiplication assume prime order subgroup points, so A and C must be in G1 and
+        # B in G2 before a proof goes anywhere near them
+        return len(proof) == 3 and self.ech.in_g1(proof[0]) and self.ech.in_g2(proof[1]) and self.ech.in_g1(proof[2])
 
     def verify(self, proof, public_inputs):
-        product_for_public_inputs = self.ech.multiply(
-            self.trusted_setup.li_tau_divided_by_gamma[0],
-            public_inputs[0].val
+        if not self.is_well_formed(proof):
+            return False
+
+        product_for_public_inputs = self._public_input_term(FQVector(public_inputs).vals)
+
+        # e(A, B) = e(alpha, beta) * e(L, gamma) * e(C, delta), checked as
+        # e(-A, B) * e(L, gamma) * e(C, delta) * e(alpha, beta) == 1 with one shared final exponentiation
+        product = self.ech.multi_pairing([
+            (proof[0], proof[1]),
+            (product_for_public_inputs, self.prepared_verifying_key["gamma_in_g2"]),
+            (proof[2], self.prepared_verifying_key["delta_in_g2"])
+        ], negate=[0])
+
+        return product * self.verifying_key["alpha_beta_in_gt"] == product.one()
+
+    def verify_batch(self, proofs, public_inputs):
+        # Checks e(A_i, B_i) = e(alpha, beta) * e(L_i, gamma) * e(C_i, delta) for all i at once by raising the
+        # i-th equation to a random rho_i and multiplying them together:
+        #   prod e(rho_i * A_i, B_i) * e(-sum rho_i * L_i, gamma) * e(-sum rho_i * C_i, delta)
+        #       = e(alpha, beta) ^ sum rho_i
+        # which is k + 2 Miller loops and a single final exponentiation. A batch containing an invalid proof
+        # passes with probability about 2^-128.
+        proofs = list(proofs)
+        public_inputs = [FQVector(inputs).vals for inputs in public_inputs]
+        if not proofs:
+            return True
+        if len(proofs) != len(public_inputs):
+            raise Exception("Expected one list of public inputs per proof")
+        if not all(self.is_well_formed(proof) for proof in proofs):
+            return False
+
+        rhos = [1] + [secrets.randbits(128) for _ in proofs[1:]]
+
+        # sum_i rho_i * L_i is a single MSM over the gamma key with the combined public inputs
+        if len({len(inputs) for inputs in public_inputs}) != 1:
+            raise Exception("Every proof needs the same number of public inputs")
+
+        product_for_public_inputs = self._public_input_term([
+            sum(rho * inputs[idx] for rho, inputs in zip(rhos, public_inputs)) % FQ.p
+            for idx in range(len(public_inputs[0]))
+        ])
+        combined_c = self.ech.msm([proof[2] for proof in proofs], rhos)
+
+        product = self.ech.multi_pairing(
+            [(self.ech.multiply(proof[0], rho), proof[1]) for rho, proof in zip(rhos, proofs)] + [
+                (product_for_public_inputs, self.prepared_verifying_key["gamma_in_g2"]),
+                (combined_c, self.prepared_verifying_key["delta_in_g2"])
+            ],
+            negate=[len(proofs), len(proofs) + 1]
         )
 
-        left = self.ech.pairing(proof[0], proof[1])
-
-        right_1 = self.ech.pairing(self.trusted_setup.alpha_in_g1, self.trusted_setup.beta_in_g2)
-        right_2 = self.ech.pairing(product_for_public_inputs, self.trusted_setup.gamma_in_g2)
-        right_3 = self.ech.pairing(proof[2], self.trusted_setup.delta_in_g2)
+        return product == self.verifying_key["alpha_beta_in_gt"] ** (sum(rhos) % FQ.p)
 
-        right = right_1 * right_2 * right_3
-
-        return left == right
+    def generate_witness(self, *args):
+        return self.circuit.generate_witness(*args)
 
     def __call__(self, *args):
-        witness = [1, 3, 27, 9, 35, 31]
-        # witness = [1, 3, 13, 9]
-        witness = [FQ(_) for _ in witness]
-
-        proof = self._generate_proof(witness)
-        self.verify(proof, witness[:1])
+        # Runs the compiled circuit on the arguments and proves the resulting witness
+        return self._generate_proof(self.generate_witness(*args))
 
 
 # @Snark
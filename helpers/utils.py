@@ -1,10 +1,8 @@
-from fields.field import FQ
+from fields.field import FQVector
 
 
 def dot(vector_a, vector_b):
-    result = FQ(0)
+    if not isinstance(vector_a, FQVector):
+        vector_a = FQVector(vector_a)
 
-    for x, y in zip(vector_a, vector_b):
-        result += x * y
-
-    return result
+    return vector_a.dot(vector_b)
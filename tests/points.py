@@ -0,0 +1,18 @@
+import os
+
+from py_ecc import optimized_bls12_381 as curve
+
+
+def point_outside_g1():
+    # On the curve but outside G1: a point of E(Fp) is in the subgroup with probability 1 / cofactor
+    x = curve.FQ(5)
+    return x, (x ** 3 + curve.b) ** ((curve.field_modulus + 1) // 4), x.one()
+
+
+def flip_last_bit(path):
+    # In an uncompressed record this changes the last y coordinate, which takes the point off the curve
+    with open(path, "r+b") as point_file:
+        point_file.seek(-1, os.SEEK_END)
+        last_byte = point_file.read(1)[0]
+        point_file.seek(-1, os.SEEK_END)
+        point_file.write(bytes([last_byte ^ 1]))
@@ -0,0 +1,108 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+from fields.field import FQ
+
+from actors.setup.ceremony import Ceremony
+from actors.setup.participant import Participant
+from actors.setup.initial_setup_generator import InitialSetupGenerator
+
+from tests.points import point_outside_g1, flip_last_bit
+
+
+class FixedSecretParticipant(Participant):
+    def __init__(self, elliptic_curve_helper, secret):
+        super().__init__(elliptic_curve_helper)
+        self.secret = secret
+
+    def generate_secret(self):
+        return self.secret
+
+
+class FixedSecretGenerator(InitialSetupGenerator):
+    def __init__(self, elliptic_curve_helper, secret):
+        super().__init__(elliptic_curve_helper)
+        self.secret = secret
+
+    def generate_secret(self):
+        return self.secret
+
+
+class TestCeremony(TestCase):
+    ech = EllipticCurveHelper()
+
+    def _assert_powers_of_tau(self, transcript, tau, n1, n2):
+        for name, generator, length in [(Ceremony.G1_SECTION, self.ech.G1, n1), (Ceremony.G2_SECTION, self.ech.G2, n2)]:
+            self.assertEqual(len(transcript[name]), length + 1)
+            for idx, point in enumerate(transcript[name]):
+                self.assertTrue(self.ech.eq(point, self.ech.multiply(generator, pow(tau, idx, FQ.p))))
+
+    def test_ceremony(self):
+        for workers in [None, 2]:
+            with tempfile.TemporaryDirectory() as directory:
+                ceremony = Ceremony(self.ech, directory, n1=6, n2=2, workers=workers, chunk_size=3)
+
+                path = ceremony.initialize(FixedSecretGenerator(self.ech, 3), ceremony.transcript_path(0))
+                for idx, secret in enumerate([5, 7]):
+                    participant = FixedSecretParticipant(self.ech, secret)
+                    path = ceremony.contribute(participant, path, ceremony.transcript_path(idx + 1))
+
+                self.assertEqual(sorted(os.listdir(directory)), [
+                    os.path.basename(ceremony.transcript_path(idx)) for idx in range(3)
+                ])
+                self._assert_powers_of_tau(ceremony.load_transcript(path), 3 * 5 * 7, 6, 2)
+
+    def test_verify_transcript(self):
+        tau = 11
+        outside_g1 = point_outside_g1()
+
+        with tempfile.TemporaryDirectory() as directory:
+            ceremony = Ceremony(self.ech, directory, n1=6, n2=2, chunk_size=3)
+
+            def write_transcript(g1_points, g2_points):
+                path = os.path.join(directory, "transcript.g16k")
+                ceremony._write_transcript(path, [
+                    (Ceremony.G1_SECTION, lambda: g1_points, ()),
+                    (Ceremony.G2_SECTION, lambda: g2_points, ())
+                ])
+                return path
+
+            g1_points = [self.ech.g1_encrypt(tau ** idx) for idx in range(7)]
+            g2_points = [self.ech.g2_encrypt(tau ** idx) for idx in range(3)]
+            ceremony.verify_transcript(write_transcript(g1_points, g2_points))
+
+            for corrupted in [
+                (g1_points[:4] + [self.ech.g1_encrypt(tau ** 4 + 1)] + g1_points[5:], g2_points),
+                (g1_points, g2_points[:2] + [self.ech.g2_encrypt(tau ** 3)]),
+                (g1_points[:6] + [outside_g1], g2_points),
+                ([self.ech.g1_encrypt(2)] + g1_points[1:], g2_points),
+                ([self.ech.G1] + [self.ech.g1_encrypt(0)] * 6, [self.ech.G2] + [self.ech.g2_encrypt(0)] * 2)
+            ]:
+                path = write_transcript(*corrupted)
+                with self.assertRaises(Exception):
+                    ceremony.verify_transcript(path)
+                with self.assertRaises(Exception):
+                    ceremony.contribute(FixedSecretParticipant(self.ech, 5), path, ceremony.transcript_path(1))
+
+            path = write_transcript(g1_points, g2_points)
+            flip_last_bit(path)
+            with self.assertRaises(Exception):
+                ceremony.verify_transcript(path)
+
+    def test_secrets(self):
+        for actor in [Participant(self.ech), InitialSetupGenerator(self.ech)]:
+            drawn = {actor.generate_secret() for _ in range(8)}
+            self.assertEqual(len(drawn), 8)
+            self.assertTrue(all(0 < secret < FQ.p for secret in drawn))
+            self.assertGreater(max(drawn).bit_length(), 128)
+
+    def test_participant_act(self):
+        g1_points = InitialSetupGenerator(self.ech).generate_chunk(self.ech.G1, 2, 0, 4)
+        g2_points = [self.ech.G2, self.ech.g2_encrypt(2)]
+        g1_points, g2_points = FixedSecretParticipant(self.ech, 9).act((g1_points, g2_points))
+
+        for idx, point in enumerate(g1_points):
+            self.assertTrue(self.ech.eq(point, self.ech.g1_encrypt(18 ** idx)))
+        self.assertTrue(self.ech.eq(g2_points[1], self.ech.g2_encrypt(18)))
@@ -0,0 +1,122 @@
+import os
+import tempfile
+
+from unittest import TestCase, mock
+
+from helpers.circuit_compiler import CircuitCompiler
+
+
+class TestCircuitCompiler(TestCase):
+    function_source = "@Snark\ndef func(x):\n    y = x ** 3\n    return x + y + 5\n"
+
+    def test_compile(self):
+        circuit = CircuitCompiler(cache_directory=None).compile(self.function_source)
+
+        self.assertEqual(circuit.symbols, ["~one", "x", "y", "sym_1", "~out", "sym_2"])
+        self.assertEqual(len(circuit.A), len(circuit.gates))
+
+        # sym_1 * x, x * x, (sym_2 + 5) * 1, (x + y) * 1
+        self.assertEqual(circuit.A.to_dense(), [
+            [0, 0, 0, 1, 0, 0],
+            [0, 1, 0, 0, 0, 0],
+            [5, 0, 0, 0, 0, 1],
+            [0, 1, 1, 0, 0, 0]
+        ])
+        self.assertEqual(circuit.B.row(0), [(1, 1)])
+        self.assertEqual(circuit.C.row(2), [(4, 1)])
+        self.assertEqual(len(circuit.qap_a), len(circuit.symbols))
+
+    def test_public_inputs(self):
+        compiler = CircuitCompiler(cache_directory=None)
+
+        circuit = compiler.compile(self.function_source)
+        self.assertEqual(circuit.public_indices, [0, 1, 4])
+        self.assertEqual(circuit.private_indices, [2, 3, 5])
+        self.assertEqual(circuit.public_inputs([1, 3, 27, 9, 35, 30]).vals, [1, 3, 35])
+
+        only_y = compiler.compile(self.function_source, ["y"])
+        self.assertEqual(only_y.public_indices, [0, 2])
+        self.assertNotEqual(only_y.circuit_hash, circuit.circuit_hash)
+
+        with self.assertRaises(Exception):
+            compiler.compile(self.function_source, ["z"])
+
+    def test_repeated_operand(self):
+        circuit = CircuitCompiler(cache_directory=None).compile("@Snark\ndef func(x):\n    return x + x\n")
+
+        self.assertEqual(circuit.A.row(0), [(1, 2)])
+        self.assertEqual(circuit.A.dot([1, 7, 14]), [14])
+
+    def test_generate_witness(self):
+        source = "@Snark\ndef func(x, z):\n    y = x ** 3\n    q = (x + 2) * (y + z)\n    return x + y + 5 + q * 2\n"
+        circuit = CircuitCompiler(cache_directory=None).compile(source)
+
+        witness = circuit.generate_witness(3, 4)
+        values = dict(zip(circuit.symbols, witness.vals))
+
+        self.assertEqual([values[_] for _ in ["~one", "x", "z", "y", "q", "~out"]], [1, 3, 4, 27, 155, 345])
+        self.assertEqual(circuit.unsatisfied_constraints(witness.vals), [])
+
+    def test_generate_witness_arguments(self):
+        circuit = CircuitCompiler(cache_directory=None).compile("@Snark\ndef func(x, z):\n    return x * z\n")
+
+        with self.assertRaisesRegex(Exception, r"\(x, z\) takes 2 arguments, got 1"):
+            circuit.generate_witness(3)
+        with self.assertRaisesRegex(Exception, r"\(x, z\) takes integer arguments, got 0.5 for z"):
+            circuit.generate_witness(3, 0.5)
+
+    def test_long_dependency_chain(self):
+        # Ordering the gates from ~out backwards walks the whole chain, far deeper than the recursion limit
+        length = 3000
+        body = "".join(f"    y{idx + 1} = y{idx} + 1\n" for idx in range(length))
+        source = f"@Snark\ndef func(y0):\n{body}    return y{length} * 2\n"
+        circuit = CircuitCompiler(cache_directory=None).compile(source)
+        circuit.symbols = circuit.symbols[:2] + circuit.symbols[:1:-1]
+
+        self.assertEqual(circuit.generate_witness(5).vals[1:3], [5, 2 * (length + 5)])
+
+    def test_float_constant_rejected(self):
+        with self.assertRaises(Exception):
+            CircuitCompiler(cache_directory=None).compile("@Snark\ndef func(x):\n    return x + 0.5\n")
+
+    def test_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            compiler = CircuitCompiler(cache_directory=directory)
+            circuit = compiler.compile(self.function_source)
+            self.assertEqual(os.listdir(directory), [f"{circuit.circuit_hash.hex()}.json"])
+
+            cached = compiler.compile(self.function_source)
+
+            self.assertEqual(cached.circuit_hash, circuit.circuit_hash)
+            self.assertEqual(cached.symbols, circuit.symbols)
+            self.assertEqual([cached.A, cached.B, cached.C], [circuit.A, circuit.B, circuit.C])
+            self.assertEqual(
+                [poly.coeffs.vals for poly in cached.qap_c],
+                [poly.coeffs.vals for poly in circuit.qap_c]
+            )
+            self.assertEqual([repr(type(_)) for _ in cached.gates], [repr(type(_)) for _ in circuit.gates])
+
+    def test_cache_opt_in(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop(CircuitCompiler.CACHE_DIRECTORY_VARIABLE, None)
+            self.assertIsNone(CircuitCompiler().cache_directory)
+
+            with tempfile.TemporaryDirectory() as directory:
+                os.environ[CircuitCompiler.CACHE_DIRECTORY_VARIABLE] = directory
+                circuit = CircuitCompiler().compile(self.function_source)
+                self.assertEqual(os.listdir(directory), [f"{circuit.circuit_hash.hex()}.json"])
+
+    def test_cache_disabled(self):
+        with mock.patch.dict(os.environ), tempfile.TemporaryDirectory() as directory:
+            os.environ[CircuitCompiler.CACHE_DIRECTORY_VARIABLE] = directory
+            compiler = CircuitCompiler(cache_directory=False)
+            compiler.compile(self.function_source)
+
+            self.assertIsNone(compiler.cache_directory)
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_decorator_line_ignored(self):
+        compiler = CircuitCompiler(cache_directory=None)
+        renamed = self.function_source.replace("@Snark", "@snark")
+
+        self.assertEqual(compiler.source_hash(self.function_source), compiler.source_hash(renamed))
@@ -2,6 +2,7 @@ from unittest import TestCase
 from helpers.dummy_trusted_setup import DummyTrustedSetup
 from helpers.elliptic_curve_helper import EllipticCurveHelper
 from helpers.polynomial_helper import Polynomial
+from helpers.evaluation_domain import EvaluationDomain
 
 from fields.field import FQ
 
@@ -90,7 +91,19 @@ class TestDummyTrustedSetup(TestCase):
 
     def test_zx_function(self):
         zx = self.trusted_setup.calculate_zx(4)
-        expected_coeffs = [FQ(24), FQ(-50), FQ(35), FQ(-10), FQ(1)]
+        expected_coeffs = [FQ(-1), FQ(0), FQ(0), FQ(0), FQ(1)]
 
         for actual_coeff, expected_coeff in zip(zx.coeffs, expected_coeffs):
             self.assertEqual(actual_coeff.val, expected_coeff.val)
+
+    def test_lagrange_basis_at_tau(self):
+        domain = EvaluationDomain.get(8)
+        lagrange_basis = self.trusted_setup.lagrange_basis_at_tau(domain)
+
+        # sum_j f(omega^j) * L_j(tau) == f(tau) for any f of degree below the domain size
+        evaluations = [self.test_polynomial.evaluate(omega) for omega in domain.elements]
+
+        self.assertEqual(
+            sum(value * basis for value, basis in zip(evaluations, lagrange_basis)) % FQ.p,
+            self.test_polynomial.evaluate(self.trusted_setup.tau) % FQ.p
+        )
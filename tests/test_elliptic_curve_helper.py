@@ -1,8 +1,13 @@
 from unittest import TestCase
+
+from py_ecc import optimized_bls12_381 as curve
+
 from helpers.elliptic_curve_helper import EllipticCurveHelper
 
 from fields.field import FQ
 
+from tests.points import point_outside_g1
+
 
 class TestEllipticCurveHelper(TestCase):
     ech = EllipticCurveHelper()
@@ -17,3 +22,98 @@ class TestEllipticCurveHelper(TestCase):
                 self.ech.g1_encrypt(FQ(-1).val * 5 + FQ(2).val * 6)
             )
         )
+
+    def test_msm(self):
+        scalars = [FQ(-1).val, 0, 7, 2 ** 200 + 3, 12, 1, 5, 9, 1024, 33, FQ(-5).val]
+        points = [self.ech.g1_encrypt(idx + 2) for idx in range(len(scalars))]
+
+        expected = self.ech.add_points([self.ech.multiply(point, scalar) for point, scalar in zip(points, scalars)])
+
+        self.assertTrue(self.ech.eq(self.ech.msm(points, scalars), expected))
+        self.assertTrue(self.ech.eq(self.ech.msm(points[:3], scalars[:3]), self.ech.add_points(
+            [self.ech.multiply(point, scalar) for point, scalar in zip(points[:3], scalars[:3])]
+        )))
+
+        # Mostly zero, one and small scalars, as in a witness
+        sparse_scalars = [0, 1, FQ(-1).val, 0, 3, 2, 1, FQ(-2).val, 200, 0, 5, 7, 9, 11, 13, 2 ** 100, 6]
+        sparse_points = [self.ech.g1_encrypt(idx + 2) for idx in range(len(sparse_scalars))]
+        self.assertTrue(self.ech.eq(self.ech.msm(sparse_points, sparse_scalars), self.ech.g1_encrypt(
+            sum((idx + 2) * scalar for idx, scalar in enumerate(sparse_scalars)) % FQ.p
+        )))
+        self.assertTrue(self.ech.eq(self.ech.msm(points, [0] * len(points)), self.ech.zero_like(points[0])))
+
+        # Empty sums are the point at infinity; mismatched lengths are an error
+        self.assertTrue(self.ech.eq(self.ech.msm([], []), self.ech.zero_like(self.ech.G1)))
+        g2_zero = self.ech.zero_like(self.ech.G2)
+        self.assertTrue(self.ech.eq(self.ech.msm([], [], g2_zero), g2_zero))
+        with self.assertRaises(Exception):
+            self.ech.msm(points, scalars[:-1])
+
+        # Terms that cancel inside a bucket, and G2 bases
+        self.assertTrue(self.ech.eq(self.ech.msm(points + points, scalars + [FQ(-_).val for _ in scalars]),
+                                    self.ech.zero_like(points[0])))
+        g2_points = [self.ech.g2_encrypt(idx + 2) for idx in range(len(scalars))]
+        self.assertTrue(self.ech.eq(self.ech.msm(g2_points, scalars), self.ech.g2_encrypt(
+            sum((idx + 2) * scalar for idx, scalar in enumerate(scalars)) % FQ.p
+        )))
+
+    def test_subgroup_checks(self):
+        point = self.ech.g1_encrypt(5)
+        self.assertTrue(self.ech.in_g1(point))
+        self.assertTrue(self.ech.in_g2(self.ech.g2_encrypt(5)))
+        self.assertFalse(self.ech.in_g2(point))
+
+        # Off the curve
+        self.assertFalse(self.ech.in_g1((point[0], point[1] + point[1].one(), point[2])))
+
+        self.assertTrue(curve.is_on_curve(point_outside_g1(), curve.b))
+        self.assertFalse(self.ech.in_g1(point_outside_g1()))
+
+    def test_fixed_base_table(self):
+        base = self.ech.g1_encrypt(17)
+        table = self.ech.fixed_base_table(base, 4)
+
+        for scalar in [0, 1, 5, 2 ** 254 + 77, FQ(-3).val]:
+            self.assertTrue(self.ech.eq(table.multiply(scalar), self.ech.multiply(base, scalar)))
+
+        with self.assertRaises(Exception):
+            self.ech.generator_table(base, 4)
+
+        g2_table = self.ech.generator_table(self.ech.G2, 1)
+        self.assertTrue(self.ech.eq(g2_table.multiply(FQ(-9).val), self.ech.g2_encrypt(FQ(-9).val)))
+
+    def test_generator_multiply_many(self):
+        scalars = [0, 1, 2, 3, FQ(-1).val, 2 ** 100]
+
+        for workers in [None, 2]:
+            points = self.ech.generator_multiply_many(self.ech.G1, scalars, workers)
+
+            for point, scalar in zip(points, scalars):
+                self.assertTrue(self.ech.eq(point, self.ech.g1_encrypt(scalar)))
+                if scalar:
+                    self.assertEqual(point[2], point[2].one())
+
+    def test_multi_pairing(self):
+        # e(3 * G1, 5 * G2) * e(2 * G1, G2) = e(G1, G2) ^ 17
+        product = self.ech.multi_pairing([
+            (self.ech.g1_encrypt(3), self.ech.g2_encrypt(5)),
+            (self.ech.g1_encrypt(2), self.ech.G2)
+        ])
+        self.assertEqual(product, self.ech.pairing(self.ech.g1_encrypt(17), self.ech.G2))
+
+        # e(-15 * G1, G2) * e(3 * G1, 5 * G2) = 1
+        product = self.ech.multi_pairing([
+            (self.ech.g1_encrypt(15), self.ech.G2),
+            (self.ech.g1_encrypt(3), self.ech.g2_encrypt(5))
+        ], negate=[0])
+        self.assertEqual(product, product.one())
+
+    def test_prepared_g2(self):
+        point_in_g2 = self.ech.g2_encrypt(1234567)
+        prepared = self.ech.prepare_g2(point_in_g2)
+
+        point_in_g1 = self.ech.g1_encrypt(7654321)
+        self.assertEqual(prepared.miller_loop(point_in_g1), self.ech.miller_loop(point_in_g1, point_in_g2))
+
+        product = self.ech.multi_pairing([(point_in_g1, prepared), (point_in_g1, point_in_g2)], negate=[0])
+        self.assertEqual(product, product.one())
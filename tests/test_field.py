@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from fields.field import FQ, FQVector, batch_inverse
+
+
+class TestFQVector(TestCase):
+    values_a = [FQ(3), FQ(-7), FQ(11), FQ(0)]
+    values_b = [FQ(5), FQ(2), FQ(-1), FQ(9)]
+
+    def test_bulk_operations(self):
+        vector_a, vector_b = FQVector(self.values_a), FQVector(self.values_b)
+
+        for operation in ["__add__", "__sub__", "__mul__"]:
+            result = getattr(vector_a, operation)(vector_b)
+            expected = [getattr(a, operation)(b) for a, b in zip(self.values_a, self.values_b)]
+
+            self.assertEqual(result.vals, [_.val for _ in expected])
+
+        self.assertEqual((vector_a * FQ(4)).vals, [(_ * FQ(4)).val for _ in self.values_a])
+        self.assertEqual(vector_a[1].val, FQ(-7).val)
+        self.assertEqual(vector_a[1:].vals, [_.val for _ in self.values_a[1:]])
+
+        for operation in ["__add__", "__sub__", "__mul__", "dot"]:
+            with self.assertRaises(Exception):
+                getattr(vector_a, operation)(vector_b[1:])
+
+    def test_inverse(self):
+        vector = FQVector(self.values_a[:3])
+
+        for value, inverse in zip(self.values_a, vector.inverse()):
+            self.assertEqual((value * inverse).val, 1)
+
+    def test_dot_and_evaluate(self):
+        vector_a, vector_b = FQVector(self.values_a), FQVector(self.values_b)
+
+        expected_dot = FQ(0)
+        for a, b in zip(self.values_a, self.values_b):
+            expected_dot += a * b
+        self.assertEqual(vector_a.dot(vector_b).val, expected_dot.val)
+
+        x = 12345
+        expected_evaluation = FQ(sum(a.val * x ** idx for idx, a in enumerate(self.values_a)))
+        self.assertEqual(vector_a.evaluate(x), expected_evaluation.val)
+
+
+class TestBatchInverse(TestCase):
+    def test_batch_inverse(self):
+        values = [FQ(2), FQ(-3), FQ(0), FQ(123456789), FQ(1)]
+
+        for value, inverse in zip(values, batch_inverse(values)):
+            expected = FQ(1) / value
+            self.assertEqual(inverse.val, expected.val)
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from py_ecc import optimized_bls12_381 as curve
+
+from helpers.jacobian import JacobianG1, JacobianG2, group_of, multiply, multiply_endomorphism, decompose
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+
+
+class TestJacobian(TestCase):
+    ech = EllipticCurveHelper()
+
+    def _check_group(self, generator, infinity):
+        group = group_of(generator)
+
+        point1 = curve.multiply(generator, 5)
+        point2 = curve.add(curve.multiply(generator, 9), curve.multiply(generator, 2))
+
+        jacobian1 = group.from_projective(point1)
+        jacobian2 = group.from_projective(point2)
+        affine2, = group.to_affine([jacobian2])
+        self.assertTrue(group.is_affine(affine2))
+
+        cases = [
+            (group.add(jacobian1, jacobian2), curve.add(point1, point2)),
+            (group.add_affine(jacobian1, affine2), curve.add(point1, point2)),
+            (group.add(jacobian1, jacobian1), curve.double(point1)),
+            (group.add_affine(group.from_projective(curve.neg(point2)), affine2), infinity),
+            (group.add(group.infinity(), jacobian2), point2),
+            (group.double(jacobian2), curve.double(point2)),
+            (multiply(group, jacobian1, 12345), curve.multiply(point1, 12345)),
+            (multiply(group, affine2, 0), infinity)
+        ]
+
+        for actual, expected in cases:
+            self.assertTrue(curve.eq(group.to_projective(actual), expected))
+
+        normalized = group.to_affine([jacobian1, group.infinity(), jacobian2])
+        for actual, expected in zip(normalized, [point1, infinity, point2]):
+            self.assertTrue(curve.eq(group.to_projective(actual), expected))
+
+    def _check_endomorphism(self, generator):
+        group = group_of(generator)
+        point = group.from_projective(curve.multiply(generator, 7))
+
+        # phi(P) = eigenvalue * P on the prime order subgroup
+        self.assertTrue(curve.eq(
+            group.to_projective(group.endomorphism(point)),
+            curve.multiply(group.to_projective(point), group.ENDOMORPHISM_EIGENVALUE)
+        ))
+
+        for scalar in [1, 2 ** 127 + 5, curve.curve_order - 1, group.ENDOMORPHISM_EIGENVALUE]:
+            k1, k2 = decompose(group, scalar)
+            self.assertEqual(k1 + k2 * group.ENDOMORPHISM_EIGENVALUE, scalar)
+            self.assertLessEqual(max(k1, k2).bit_length(), 129)
+
+            for base in [point, group.double(point)]:
+                self.assertTrue(curve.eq(
+                    group.to_projective(multiply_endomorphism(group, base, scalar)),
+                    curve.multiply(group.to_projective(base), scalar)
+                ))
+
+    def test_g1(self):
+        self.assertIs(group_of(self.ech.G1), JacobianG1)
+        self._check_group(self.ech.G1, curve.Z1)
+        self._check_endomorphism(self.ech.G1)
+
+    def test_g2(self):
+        self.assertIs(group_of(self.ech.G2), JacobianG2)
+        self._check_group(self.ech.G2, curve.Z2)
+        self._check_endomorphism(self.ech.G2)
@@ -0,0 +1,81 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+from py_ecc import optimized_bls12_381 as curve
+
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+from helpers.key_serializer import KeySerializer, PROVING_KEY, circuit_hash
+
+from tests.points import point_outside_g1, flip_last_bit
+
+
+class TestKeySerializer(TestCase):
+    ech = EllipticCurveHelper()
+
+    key = {
+        "single_g1": ech.g1_encrypt(5),
+        "list_g1": [EllipticCurveHelper().g1_encrypt(idx) for idx in range(4)],
+        "list_g2": [EllipticCurveHelper().g2_encrypt(idx) for idx in range(3)],
+        "single_g2": ech.g2_encrypt(11),
+        "single_gt": curve.FQ12(list(range(1, 13)))
+    }
+
+    def _assert_round_trip(self, compressed):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "key.pk")
+            key_hash = circuit_hash("circuit")
+
+            KeySerializer.dump(path, self.key, PROVING_KEY, key_hash, compressed)
+            loaded = KeySerializer.load(path, key_hash)
+
+            self.assertEqual(loaded.key_type, PROVING_KEY)
+            self.assertEqual(list(loaded.keys()), list(self.key.keys()))
+
+            self.assertTrue(self.ech.eq(loaded["single_g1"], self.key["single_g1"]))
+            self.assertTrue(self.ech.eq(loaded["single_g2"], self.key["single_g2"]))
+            self.assertEqual(loaded["single_gt"], self.key["single_gt"])
+
+            for name in ["list_g1", "list_g2"]:
+                self.assertEqual(len(loaded[name]), len(self.key[name]))
+                for actual, expected in zip(loaded[name], self.key[name]):
+                    self.assertTrue(self.ech.eq(actual, expected))
+
+            unpickled = pickle.loads(pickle.dumps(loaded["list_g2"]))
+            self.assertTrue(self.ech.eq(unpickled[2], self.key["list_g2"][2]))
+
+            with self.assertRaises(Exception):
+                KeySerializer.load(path, circuit_hash("another circuit"))
+
+    def test_uncompressed_round_trip(self):
+        self._assert_round_trip(False)
+
+    def test_compressed_round_trip(self):
+        self._assert_round_trip(True)
+
+    def test_invalid_points_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "key.pk")
+            KeySerializer.dump(path, {"list_g1": self.key["list_g1"]}, PROVING_KEY, circuit_hash("circuit"))
+
+            flip_last_bit(path)
+
+            loaded = KeySerializer.load(path)
+            self.assertTrue(self.ech.eq(loaded["list_g1"][1], self.key["list_g1"][1]))
+            with self.assertRaises(Exception):
+                loaded["list_g1"][3]
+
+            KeySerializer.dump(path, {"list_g1": self.key["list_g1"] + [point_outside_g1()]}, PROVING_KEY, bytes(32))
+
+            KeySerializer.load(path)
+            with self.assertRaises(Exception):
+                KeySerializer.load(path, validate=True)
+            KeySerializer.dump(path, self.key, PROVING_KEY, bytes(32))
+            KeySerializer.load(path, validate=True)
+
+    def test_long_section_name_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(Exception):
+                KeySerializer.dump(os.path.join(directory, "key.pk"), {"x" * 33: self.key["single_g1"]},
+                                   PROVING_KEY, bytes(32))
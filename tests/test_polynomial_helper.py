@@ -0,0 +1,61 @@
+import random
+from unittest import TestCase
+
+from helpers.evaluation_domain import EvaluationDomain
+from helpers.polynomial_helper import Polynomial
+
+from fields.field import FQ
+
+
+class TestPolynomialHelper(TestCase):
+    @staticmethod
+    def _schoolbook(coeffs_a, coeffs_b):
+        result = [0 for _ in range(len(coeffs_a) + len(coeffs_b) - 1)]
+        for idx_a, a in enumerate(coeffs_a):
+            for idx_b, b in enumerate(coeffs_b):
+                result[idx_a + idx_b] += a * b
+        return [FQ(_).val for _ in result]
+
+    def test_fft_round_trip(self):
+        domain = EvaluationDomain.get(16)
+        coeffs = [random.randrange(FQ.p) for _ in range(16)]
+        poly = Polynomial(coeffs)
+
+        evaluations = domain.fft(coeffs)
+        for x, y in zip(domain.elements, evaluations):
+            self.assertEqual(FQ(poly.evaluate(x)).val, y)
+
+        coset_evaluations = domain.coset_fft(coeffs)
+        for x, y in zip(domain.elements, coset_evaluations):
+            self.assertEqual(FQ(poly.evaluate(x * domain.coset_shift)).val, y)
+
+        self.assertEqual(domain.ifft(evaluations), coeffs)
+        self.assertEqual(domain.coset_ifft(coset_evaluations), coeffs)
+
+    def test_multiplication_and_division(self):
+        for length_a, length_b in [(3, 5), (150, 100), (300, 70)]:
+            coeffs_a = [random.randrange(FQ.p) for _ in range(length_a)]
+            coeffs_b = [random.randrange(FQ.p) for _ in range(length_b)]
+
+            product = Polynomial(coeffs_a) * Polynomial(coeffs_b)
+            self.assertEqual([_.val for _ in product.coeffs], self._schoolbook(coeffs_a, coeffs_b))
+
+            quotient = product / Polynomial(coeffs_b)
+            self.assertEqual([_.val for _ in quotient.coeffs], coeffs_a)
+
+        with self.assertRaises(Exception):
+            Polynomial([1, 2, 3, 4]) / Polynomial([1, 1])
+
+    def test_from_points(self):
+        points = [(FQ(x + 1), FQ(random.randrange(FQ.p))) for x in range(20)]
+        poly = Polynomial.from_points(points)
+
+        for x, y in points:
+            self.assertEqual(FQ(poly.evaluate(x.val)).val, y.val)
+
+        domain = EvaluationDomain.get(8)
+        points = [(FQ(x), FQ(random.randrange(FQ.p))) for x in domain.elements]
+        poly = Polynomial.from_points(points)
+
+        for x, y in points:
+            self.assertEqual(FQ(poly.evaluate(x.val)).val, y.val)
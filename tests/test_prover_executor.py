@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from helpers.elliptic_curve_helper import EllipticCurveHelper
+from helpers.prover_executor import (
+    SerialProverExecutor, ThreadPoolProverExecutor, ProcessPoolProverExecutor, _PoolProverExecutor
+)
+
+from fields.field import FQ
+
+
+class TestProverExecutor(TestCase):
+    ech = EllipticCurveHelper()
+
+    bases = {
+        "g1": [EllipticCurveHelper().g1_encrypt(idx + 1) for idx in range(40)],
+        "g2": [EllipticCurveHelper().g2_encrypt(idx + 1) for idx in range(3)]
+    }
+    jobs = [
+        ("g1", [FQ(-idx).val for idx in range(40)]),
+        ("g2", [5, 6, 7]),
+        ("g1", [idx * idx for idx in range(33)])
+    ]
+
+    def test_executors_agree(self):
+        serial = SerialProverExecutor()
+        serial.load(self.bases)
+        expected = serial.msm_many(self.jobs)
+
+        for executor in [SerialProverExecutor(), ThreadPoolProverExecutor(3), ProcessPoolProverExecutor(2)]:
+            executor.load(self.bases)
+            try:
+                for _ in range(2):
+                    for actual_point, expected_point in zip(executor.msm_many(self.jobs), expected):
+                        self.assertTrue(self.ech.eq(actual_point, expected_point))
+
+                # Bases prepared for a batch give the same sums
+                executor.prepare()
+                for actual_point, expected_point in zip(executor.msm_many(self.jobs), expected):
+                    self.assertTrue(self.ech.eq(actual_point, expected_point))
+                executor.release()
+            finally:
+                executor.close()
+
+    def test_pool_base_is_abstract(self):
+        with self.assertRaises(TypeError):
+            _PoolProverExecutor()
@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+from py_ecc import optimized_bls12_381 as curve
+
+from helpers.scalar_recoding import wnaf, signed_window_digits
+
+
+class TestScalarRecoding(TestCase):
+    scalars = [0, 1, 7, 8, 255, 2 ** 127 + 5, curve.curve_order - 1]
+
+    def test_wnaf(self):
+        for width in [2, 4, 5]:
+            for scalar in self.scalars:
+                digits = wnaf(scalar, width)
+                self.assertEqual(sum(digit << idx for idx, digit in enumerate(digits)), scalar)
+
+                nonzero = [idx for idx, digit in enumerate(digits) if digit]
+                for idx in nonzero:
+                    self.assertEqual(digits[idx] % 2, 1)
+                    self.assertLess(abs(digits[idx]), 1 << (width - 1))
+                for first, second in zip(nonzero, nonzero[1:]):
+                    self.assertGreaterEqual(second - first, width)
+
+    def test_signed_window_digits(self):
+        for window_size in [1, 3, 8]:
+            for scalar in self.scalars:
+                num_windows = scalar.bit_length() // window_size + 1
+                digits = signed_window_digits(scalar, window_size, num_windows)
+
+                self.assertEqual(sum(digit << (idx * window_size) for idx, digit in enumerate(digits)), scalar)
+                for digit in digits:
+                    self.assertLessEqual(abs(digit), 1 << (window_size - 1))
@@ -1,3 +1,4 @@
+import tempfile
 from unittest import TestCase
 from unittest.mock import MagicMock
 
@@ -5,6 +6,8 @@ from helpers.snark_helper import Snark
 from helpers.polynomial_helper import Polynomial
 from fields.field import FQ
 
+from tests.points import point_outside_g1
+
 
 class TestSnarkHelper(TestCase):
     function_source = '''@Snark\ndef foo(x):\n\ty = x ** 3\n\treturn x + y + 5'''
@@ -45,6 +48,10 @@ class TestSnarkHelper(TestCase):
         trusted_setup = self.snark_helper.trusted_setup
         ech = self.snark_helper.ech
 
+        # The Snark setup skips the SRS, compute_li needs it
+        if trusted_setup.powers_of_tau_in_g1 is None:
+            trusted_setup.compute_powers_of_tau()
+
         for idx in range(len(qap_a)):
             result_in_g1 = self.snark_helper.trusted_setup.compute_li(idx, qap_a, qap_b, qap_c)
 
@@ -103,8 +110,8 @@ class TestSnarkHelper(TestCase):
         trusted_setup = self.snark_helper.trusted_setup
 
         w_dot_li_in_g1 = ech.add_points(
-            [ech.multiply(trusted_setup.li_tau_divided_by_delta[idx - 1], witness[idx].val)
-             for idx in range(1, len(trusted_setup.li_tau_divided_by_delta) + 1)]
+            [ech.multiply(point, witness[idx].val)
+             for point, idx in zip(trusted_setup.li_tau_divided_by_delta, self.snark_helper.circuit.private_indices)]
         )
         return w_dot_li_in_g1
 
@@ -119,7 +126,7 @@ class TestSnarkHelper(TestCase):
                   self.snark_helper.qap_c[idx].evaluate(tau)
                   for idx in range(len(self.snark_helper.qap_a))]
 
-        l_tau = sum([test_witness[idx].val * li_tau[idx] for idx in range(1, len(li_tau))])
+        l_tau = sum([test_witness[idx].val * li_tau[idx] for idx in self.snark_helper.circuit.private_indices])
 
         delta_inverse = (FQ(1) / FQ(trusted_setup.delta)).val
 
@@ -204,7 +211,7 @@ class TestSnarkHelper(TestCase):
                   self.snark_helper.qap_c[idx].evaluate(tau)
                   for idx in range(len(self.snark_helper.qap_a))]
 
-        l_tau = sum([test_witness[idx].val * li_tau[idx] for idx in range(1, len(li_tau))])
+        l_tau = sum([test_witness[idx].val * li_tau[idx] for idx in self.snark_helper.circuit.private_indices])
         h_tau = self.snark_helper.calculate_hx(test_witness).evaluate(tau)
         z_tau = self.snark_helper.trusted_setup.zx.evaluate(tau)
 
@@ -230,9 +237,9 @@ class TestSnarkHelper(TestCase):
         ech = self.snark_helper.ech
         trusted_setup = self.snark_helper.trusted_setup
 
-        product_for_public_inputs = ech.multiply(
-            trusted_setup.li_tau_divided_by_gamma[0],
-            public_inputs[0].val
+        product_for_public_inputs = ech.msm(
+            trusted_setup.li_tau_divided_by_gamma,
+            [x.val for x in public_inputs]
         )
 
         left = ech.pairing(proof[0], proof[1])
@@ -257,7 +264,7 @@ class TestSnarkHelper(TestCase):
                   self.snark_helper.qap_c[idx].evaluate(tau)
                   for idx in range(len(self.snark_helper.qap_a))]
 
-        l_tau = sum([test_witness[idx].val * li_tau[idx] for idx in range(1, len(li_tau))])
+        l_tau = sum([test_witness[idx].val * li_tau[idx] for idx in self.snark_helper.circuit.private_indices])
 
         self.assertTrue(
             ech.pairing(
@@ -291,7 +298,7 @@ class TestSnarkHelper(TestCase):
                   self.snark_helper.qap_c[idx].evaluate(tau)
                   for idx in range(len(self.snark_helper.qap_a))]
 
-        right_2 = li_tau[0] * test_witness[0].val
+        right_2 = sum([li_tau[idx] * test_witness[idx].val for idx in self.snark_helper.circuit.public_indices])
         right_3 = self._get_third_element_of_proof(test_witness) * trusted_setup.delta
 
         self.assertTrue(FQ(left).val == FQ(right_1 + right_2 + right_3).val)
@@ -314,4 +321,112 @@ class TestSnarkHelper(TestCase):
         test_witness = [FQ(_) for _ in test_witness]
 
         proof = self.snark_helper._generate_proof(test_witness)
-        self.assertTrue(self.snark_helper.verify(proof, test_witness[:1]))
+        self.assertTrue(self.snark_helper.verify(proof, self.snark_helper.public_inputs(test_witness)))
+
+    def test_call(self):
+        self.assertEqual(self.snark_helper.generate_witness(3).vals, [1, 3, 27, 9, 35, 30])
+
+        proof = self.snark_helper(3)
+        self.assertTrue(self.snark_helper.verify(proof, [1, 3, 35]))
+        self.assertFalse(self.snark_helper.verify(proof, [1, 3, 36]))
+
+    def test_no_private_symbols(self):
+        # Every symbol is public and h(x) is zero, so two of the prover's MSMs are empty
+        source_parser = MagicMock()
+        source_parser.get_source.return_value = "@Snark\ndef bar(x):\n\treturn x * x"
+        snark = Snark(MagicMock(), source_parser)
+
+        proof = snark(3)
+        self.assertEqual(snark.circuit.private_indices, [])
+        self.assertTrue(snark.verify(proof, [1, 3, 9]))
+        self.assertFalse(snark.verify(proof, [1, 3, 10]))
+
+    def test_malformed_proof(self):
+        A, B, C = self.snark_helper(3)
+        ech = self.snark_helper.ech
+
+        for proof in [
+            [(A[0], A[1] + A[1].one(), A[2]), B, C],
+            [point_outside_g1(), B, C],
+            [A, B, (C[0], C[1] + C[1].one(), C[2])],
+            [A, (B[0], B[1] + B[1].one(), B[2]), C],
+            [A, ech.G1, C]
+        ]:
+            self.assertFalse(self.snark_helper.verify(proof, [1, 3, 35]))
+            self.assertFalse(self.snark_helper.verify_batch([[A, B, C], proof], [[1, 3, 35], [1, 3, 35]]))
+
+    def test_prove_batch(self):
+        witnesses = [self.snark_helper.generate_witness(x) for x in [3, 5]]
+
+        proofs = self.snark_helper.prove_batch(witnesses)
+        self.assertFalse(isinstance(proofs, list))
+
+        for proof, witness in zip(proofs, witnesses):
+            self.assertTrue(self.snark_helper.verify(proof, self.snark_helper.public_inputs(witness)))
+        self.assertIsNone(self.snark_helper.executor.prepared)
+
+        # Streamed witnesses, dispatched two proofs at a time
+        witnesses = [self.snark_helper.generate_witness(x) for x in [2, 4, 6]]
+        proofs = list(self.snark_helper.prove_batch(iter(witnesses), batch_size=2))
+        self.assertEqual(len(proofs), 3)
+        for proof, witness in zip(proofs, witnesses):
+            self.assertTrue(self.snark_helper.verify(proof, self.snark_helper.public_inputs(witness)))
+
+        # The default group size bounds how much of a long input is consumed before the first proof
+        consumed = []
+
+        def witness_stream():
+            for x in range(10):
+                consumed.append(x)
+                yield self.snark_helper.generate_witness(x)
+
+        next(self.snark_helper.prove_batch(witness_stream()))
+        self.assertEqual(len(consumed), Snark.PROOF_GROUP_SIZE)
+
+    def test_verify_batch(self):
+        witnesses = [self.snark_helper.generate_witness(x) for x in [3, 4, 5]]
+        proofs = list(self.snark_helper.prove_batch(witnesses))
+        public_inputs = [self.snark_helper.public_inputs(witness) for witness in witnesses]
+
+        self.assertTrue(self.snark_helper.verify_batch(proofs, public_inputs))
+
+        # Swapping C between two proofs breaks both equations
+        tampered = [proofs[0][:2] + proofs[1][2:], proofs[1][:2] + proofs[0][2:], proofs[2]]
+        self.assertFalse(self.snark_helper.verify_batch(tampered, public_inputs))
+
+        # A proof checked against another statement's public inputs
+        self.assertFalse(self.snark_helper.verify_batch(proofs, public_inputs[1:] + public_inputs[:1]))
+
+    def test_invalid_witness(self):
+        # ~out should be 35, which breaks the constraint ~out = sym_2 + 5
+        test_witness = [FQ(_) for _ in [1, 3, 27, 9, 36, 30]]
+
+        with self.assertRaises(Exception) as context:
+            self.snark_helper.verify_witness(test_witness)
+
+        self.assertIn("constraint 2 (~out = sym_2 + 5)", str(context.exception))
+
+    def test_persisted_keys(self):
+        test_witness = [1, 3, 27, 9, 35, 30]
+        test_witness = [FQ(_) for _ in test_witness]
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.snark_helper.key_directory = directory
+            self.snark_helper.save_keys()
+            self.snark_helper.key_directory = None
+
+            loaded_snark = Snark(MagicMock(), self.source_parser, key_directory=directory)
+
+            proof = loaded_snark._generate_proof(test_witness)
+            self.assertTrue(self.snark_helper.verify(proof, self.snark_helper.public_inputs(test_witness)))
+
+            # The executor decodes the mapped bases once instead of on every proof
+            self.assertIsInstance(loaded_snark.executor.bases["qap_a_tau_in_g1"], list)
+            self.assertTrue(loaded_snark.verify(proof, self.snark_helper.public_inputs(test_witness)))
+
+            # Loaded keys can be saved again over the files they are mapped from
+            loaded_snark.save_keys()
+            reloaded_snark = Snark(MagicMock(), self.source_parser, key_directory=directory)
+            proof = reloaded_snark._generate_proof(test_witness)
+            self.assertTrue(reloaded_snark.verify(proof, self.snark_helper.public_inputs(test_witness)))
+            self.assertTrue(loaded_snark.verify(proof, self.snark_helper.public_inputs(test_witness)))
@@ -1,20 +1,34 @@
 from helpers.elliptic_curve_helper import EllipticCurveHelper
 
+from actors.setup.ceremony import Ceremony
 from actors.setup.participant import Participant
 from actors.setup.initial_setup_generator import InitialSetupGenerator
 
 
 N_PARTICIPANTS = 1
+N_WORKERS = 4
 
-elliptic_curve_helper = EllipticCurveHelper()
+TRANSCRIPT_DIRECTORY = "ceremony"
 
-initial_setup_generator = InitialSetupGenerator(elliptic_curve_helper)
-participants = [Participant(elliptic_curve_helper) for _ in range(N_PARTICIPANTS)]
 
-generated_points = initial_setup_generator.act()
+def main():
+    elliptic_curve_helper = EllipticCurveHelper()
 
-for idx, participant in enumerate(participants):
-    generated_points = participant.act(generated_points)
-    print(f"Participant - {idx} ceremony role complete")
+    initial_setup_generator = InitialSetupGenerator(elliptic_curve_helper)
+    participants = [Participant(elliptic_curve_helper) for _ in range(N_PARTICIPANTS)]
 
-print(generated_points)
+    ceremony = Ceremony(elliptic_curve_helper, TRANSCRIPT_DIRECTORY, workers=N_WORKERS)
+
+    # Transcript 0 is the initial setup and transcript i the one after participant i
+    transcript_path = ceremony.initialize(initial_setup_generator, ceremony.transcript_path(0))
+
+    for idx, participant in enumerate(participants):
+        transcript_path = ceremony.contribute(participant, transcript_path, ceremony.transcript_path(idx + 1))
+        print(f"Participant - {idx} ceremony role complete")
+
+    print(f"Powers of tau written to {transcript_path}")
+
+
+# Pool workers started with spawn or forkserver import this module again, so the ceremony only runs from here
+if __name__ == "__main__":
+    main()